@@ -2,6 +2,12 @@ from typing  import TypedDict,Annotated,Sequence,Optional
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
+class CompactReport(TypedDict):
+    """Structured monthly spending report, rendered to markdown only for the user"""
+    total: float
+    by_category: list   # [{category, total_spent, transaction_count}]
+    budget_status: list # [{category, budget, spent, usage_percent}]
+
 class AgentState(TypedDict):
     messages:Annotated[Sequence[BaseMessage],add_messages]
     chat_memory: str
@@ -17,4 +23,5 @@ class AgentState(TypedDict):
     transaction_data: Optional[dict]  # Parsed transaction
     budget_status: Optional[dict]     # Current budget usage
     alert_message: Optional[str]      # Warning/alert if any
+    report_data: Optional[CompactReport]  # Structured spending report
     finance_mode: bool     
@@ -1,290 +1,477 @@
-from agent.class_agent import AgentState
+from agent.class_agent import AgentState, CompactReport
 from smart_budget_manager.transaction_parser import parse_transaction
-from smart_budget_manager.spending_analyser import SpendingAnalyzer
+from smart_budget_manager.spending_analyser import SpendingAnalyzer, get_spending_analyzer
 from smart_budget_manager.alert_generator import AlertGenerator
+from smart_budget_manager.spending_cache import get_spending_cache
+from smart_budget_manager.spending_batcher import get_spending_batcher
+from db_.neo4j_finance import get_finance_db
 from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import NamedTuple, Optional
 from datetime import datetime, timedelta
+import asyncio
+import functools
+import re
+
+# Intent keywords, checked in priority order (first match wins)
+DAILY_KW = ("today", "spent today", "expenses today", "transactions today", "today's spending")
+YESTERDAY_KW = ("yesterday", "spent yesterday", "yesterday's spending")
+WEEKLY_KW = ("last 7 days", "past week", "this week")
+REPORT_KW = (
+    "total spent", "how much spent", "spending", "expenses", "remaining", "left", "balance",
+    "budget status", "monthly report", "spending report", "show spending",
+    "how much did i spend", "what did i spend", "spent for",
+)
+TXN_KW = ("spent", "paid", "bought", "purchased", "cost", "rupees", "₹", "rs")
+
+CATEGORIES = frozenset({"food", "transport", "shopping", "entertainment", "bills", "health", "education"})
+
+
+def _alternation(keywords) -> str:
+    return "|".join(re.escape(kw) for kw in keywords)
+
+
+# Lookahead branches keep the old priority: the first group whose keyword
+# appears anywhere in the message wins (today > yesterday > week > report > txn)
+INTENT_RE = re.compile(
+    r"^(?:" + "|".join(
+        rf"(?=.*?(?P<{name}>{_alternation(keywords)}))"
+        for name, keywords in (
+            ("today", DAILY_KW),
+            ("yesterday", YESTERDAY_KW),
+            ("week", WEEKLY_KW),
+            ("report", REPORT_KW),
+            ("txn", TXN_KW),
+        )
+    ) + r")",
+    re.DOTALL
+)
+
+# Regex rather than a token-set intersection so the first category mentioned wins
+CATEGORY_RE = re.compile(rf"\b({_alternation(sorted(CATEGORIES))})\b")
+
+# Cheap guard before the LLM parser: a transaction needs at least one digit.
+# Not word-bounded so "50rs" / "₹50" still pass.
+_AMOUNT_RE = re.compile(r"\d")
+
+# Common budget phrasings handled without the LLM:
+#   "set food budget to 5000", "my transport budget is 2000 monthly"
+#   "budget is 500 on food", "5000 for shopping"
+_BUDGET_CATEGORIES = _alternation(sorted(CATEGORIES | {"other"}))
+_BUDGET_RE = re.compile(
+    rf"\b(?P<cat1>{_BUDGET_CATEGORIES})\b\D*?(?P<amt1>\d+(?:\.\d+)?)"
+    rf"|(?P<amt2>\d+(?:\.\d+)?)\s*(?:rs\.?|rupees|₹)?\s*(?:on|for)\s+(?P<cat2>{_BUDGET_CATEGORIES})\b"
+)
+
+# The fast path only trusts messages with a single plain number. Anything
+# else goes to the LLM: "5k" / "2 lakh" (unit suffix), "from 3000 to 5000",
+# "march 2025 is 5000" (several numbers), "the 5th", "10%" or "increase by
+# 500" (the number isn't the new limit)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_NOT_A_LIMIT_RE = re.compile(
+    r"\d\s*(?:k|lakhs?|lacs?|thousand|crores?|cr|st|nd|rd|th)\b|\d\s*%"
+    r"|\b(?:increase|decrease|reduce|raise|lower|cut|add|by)\b"
+)
+
+# Budget usage threshold (percent) -> status emoji
+EMOJI = {100: "🚨", 75: "⚠️", 0: "✅"}
 
 class BudgetIntent(BaseModel):
     """Parsed budget setup intent"""
+    model_config = ConfigDict(frozen=True)
+    
     category: str = Field(..., description="Budget category (food, transport, shopping, etc.)")
     limit: float = Field(..., description="Monthly budget limit in INR")
 
 
-def finance_transaction_handler(state: AgentState, kg_conn, user_id: str) -> AgentState:
-    """Handle finance-related queries and transactions with IMPROVED QUERY DETECTION"""
+_ALERT_GEN = AlertGenerator()
+
+BUDGET_SYSTEM_PROMPT = """
+Extract budget settings from user message.
+
+RULES:
+- Category must be one of: food, transport, shopping, entertainment, bills, health, education, other
+- Limit must be a positive number in INR
+
+Examples:
+- "Set food budget to 5000" → category: food, limit: 5000
+- "My transport budget is 2000 monthly" → category: transport, limit: 2000
+- "budget is 500 on food for this month" → category: food, limit: 500
+- "change food budget to 3000" → category: food, limit: 3000
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def _budget_chain():
+    """Build the budget-intent chain on first use (only budget setup needs the LLM)"""
+    from llm.groq_client import groq_chat
+    from langchain_core.prompts import ChatPromptTemplate
     
-    messages = state.get("messages", [])
-    last_message = messages[-1].content if messages else ""
+    llm = groq_chat(model="llama-3.1-8b-instant", temperature=0)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", BUDGET_SYSTEM_PROMPT),
+        ("human", "{message}")
+    ])
+    return prompt | llm.with_structured_output(BudgetIntent)
+
+
+def _parse_budget_fast(message: str) -> Optional[BudgetIntent]:
+    """Regex fast-path for budget intents; None means fall back to the LLM"""
+    text = message.lower().replace(",", "")
+    if len(_NUMBER_RE.findall(text)) != 1 or _NOT_A_LIMIT_RE.search(text):
+        return None
     
-    from db_.neo4j_finance import get_finance_db
-    finance_db = get_finance_db()  
+    match = _BUDGET_RE.search(text)
+    if not match:
+        return None
     
-    analyzer = SpendingAnalyzer(finance_db.kg)  
-    alert_gen = AlertGenerator()
+    category = match.group("cat1") or match.group("cat2")
+    limit = float(match.group("amt1") or match.group("amt2"))
+    if limit <= 0:
+        return None
+    return BudgetIntent(category=category, limit=limit)
 
-    query_lower = last_message.lower()
 
-    if any(kw in query_lower for kw in [
-        "today", "spent today", "expenses today", 
-        "transactions today", "today's spending"
-    ]):
-        print(f"[FinanceHandler] → Daily spending report (TODAY)")
-        
-        try:
-            summary = analyzer.get_daily_summary(user_id)
-            transactions = analyzer.get_daily_spending(user_id)
-        except Exception as e:
-            print(f"[FinanceHandler] ❌ Database error: {e}")
-            state["messages"].append(
-                AIMessage(content="⚠️ I'm having trouble accessing your financial data.")
-            )
-            return state
-        
-        if summary['total'] == 0:
-            response = "You haven't logged any transactions today yet."
-        else:
-            response = f"📅 **Today's Spending Report**\n\n"
-            response += f"**Total spent today:** ₹{summary['total']:,.2f}\n"
-            response += f"**Transactions:** {summary['transaction_count']}\n\n"
-            
-            if summary['by_category']:
-                response += "**By category:**\n"
-                for item in summary['by_category']:
-                    response += f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f} ({item['transaction_count']} transactions)\n"
-            
-            # Show individual transactions if <= 5
-            if len(transactions) <= 5:
-                response += "\n**Individual Transactions:**\n"
-                for txn in transactions:
-                    response += f"• ₹{txn['amount']:.2f} - {txn['description']} ({txn['category']})\n"
-        
-        state["messages"].append(AIMessage(content=response))
-        return state
+def _first_error(results) -> Optional[BaseException]:
+    """Return the first exception captured by asyncio.gather(..., return_exceptions=True)"""
+    return next((r for r in results if isinstance(r, BaseException)), None)
 
-    if any(kw in query_lower for kw in [
-        "yesterday", "spent yesterday", "yesterday's spending"
-    ]):
-        print(f"[FinanceHandler] → Daily spending report (YESTERDAY)")
-        
-        yesterday = datetime.now() - timedelta(days=1)
-        
-        try:
-            summary = analyzer.get_daily_summary(user_id, yesterday)
-            transactions = analyzer.get_daily_spending(user_id, yesterday)
-        except Exception as e:
-            print(f"[FinanceHandler] ❌ Database error: {e}")
-            state["messages"].append(
-                AIMessage(content="⚠️ I'm having trouble accessing your financial data.")
-            )
-            return state
-        
-        if summary['total'] == 0:
-            response = "You didn't log any transactions yesterday."
-        else:
-            response = f"📅 **Yesterday's Spending Report**\n\n"
-            response += f"**Total spent:** ₹{summary['total']:,.2f}\n"
-            response += f"**Transactions:** {summary['transaction_count']}\n\n"
-            
-            if summary['by_category']:
-                response += "**By category:**\n"
-                for item in summary['by_category']:
-                    response += f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f}\n"
+
+def render_spending_report(report: CompactReport) -> str:
+    """
+    Render a monthly spending report as user-facing markdown
+    
+    Args:
+        report: Structured report from state["report_data"]
         
-        state["messages"].append(AIMessage(content=response))
-        return state
+    Returns:
+        Markdown summary with category breakdown and budget status
+    """
+    parts = [
+        "📊 **Spending Summary**\n\n",
+        f"**Total spent this month:** ₹{report['total']:,.2f}\n\n",
+    ]
+    parts_append = parts.append
     
+    if report['by_category']:
+        parts_append("**By category:**\n")
+        for item in report['by_category']:
+            parts_append(f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f} ({item['transaction_count']} transactions)\n")
     
-    if any(kw in query_lower for kw in ["last 7 days", "past week", "this week"]):
-        print(f"[FinanceHandler] → Weekly spending report")
-        
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=7)
+    # Add budget status if available
+    if report['budget_status']:
+        parts_append("\n**Budget Status:**\n")
+        for item in report['budget_status']:
+            used = item['usage_percent']
+            spent = item['spent']
+            budget = item['budget']
+            emoji = EMOJI[100 if used >= 100 else 75 if used >= 75 else 0]
+            parts_append(f"{emoji} {item['category'].capitalize()}: ₹{spent:,.2f} / ₹{budget:,.2f} ({used:.1f}% used, ₹{budget - spent:,.2f} remaining)\n")
+    
+    return "".join(parts)
+
+
+class _FinanceRequest(NamedTuple):
+    """Per-request context shared by the intent handlers"""
+    user_id: str
+    message: str
+    query_lower: str
+    finance_db: object
+    analyzer: SpendingAnalyzer
+    now: datetime           # Taken once per request
+    today_start: datetime   # Midnight of `now`
+
+
+_DB_ERROR_MESSAGE = "⚠️ I'm having trouble accessing your financial data."
+
+
+def db_guarded(error_message: str = _DB_ERROR_MESSAGE):
+    """
+    Turn a database failure inside an intent handler into a friendly reply.
+    
+    Args:
+        error_message: Message appended to the state when the handler raises
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(state: AgentState, req: _FinanceRequest) -> AgentState:
+            try:
+                return await handler(state, req)
+            except Exception as e:
+                print(f"[FinanceHandler] ❌ Database error: {e}")
+                state["messages"].append(AIMessage(content=error_message))
+                return state
+        return wrapper
+    return decorator
+
+
+async def _fetch_daily(req: _FinanceRequest, day: datetime):
+    """Fetch (summary, transactions) for one day concurrently, raising the first error"""
+    cache = get_spending_cache()
+    day_key = day.date()
+    results = await asyncio.gather(
+        asyncio.to_thread(cache.get_or_load, (req.user_id, "daily_summary", day_key),
+                          req.analyzer.get_daily_summary, req.user_id, day),
+        asyncio.to_thread(cache.get_or_load, (req.user_id, "daily_spending", day_key),
+                          req.analyzer.get_daily_spending, req.user_id, day),
+        return_exceptions=True
+    )
+    error = _first_error(results)
+    if error:
+        raise error
+    return results
+
+
+@db_guarded()
+async def _handle_today(state: AgentState, req: _FinanceRequest) -> AgentState:
+    print(f"[FinanceHandler] → Daily spending report (TODAY)")
+    
+    summary, transactions = await _fetch_daily(req, req.today_start)
+    
+    if summary['total'] == 0:
+        response = "You haven't logged any transactions today yet."
+    else:
+        parts = [
+            "📅 **Today's Spending Report**\n\n",
+            f"**Total spent today:** ₹{summary['total']:,.2f}\n",
+            f"**Transactions:** {summary['transaction_count']}\n\n",
+        ]
+        parts_append = parts.append
         
-        try:
-            transactions = analyzer.get_date_range_spending(user_id, start_date, end_date)
-        except Exception as e:
-            print(f"[FinanceHandler] ❌ Database error: {e}")
-            state["messages"].append(
-                AIMessage(content="⚠️ I'm having trouble accessing your financial data.")
-            )
-            return state
+        if summary['by_category']:
+            parts_append("**By category:**\n")
+            for item in summary['by_category']:
+                parts_append(f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f} ({item['transaction_count']} transactions)\n")
         
-        if not transactions:
-            response = "No transactions in the last 7 days."
-        else:
-            total = sum(t['amount'] for t in transactions)
-            response = f"📊 **Last 7 Days Spending**\n\n"
-            response += f"**Total:** ₹{total:,.2f} ({len(transactions)} transactions)\n\n"
-            
-            # Group by date
-            by_date = {}
+        # Show individual transactions if <= 5
+        if len(transactions) <= 5:
+            parts_append("\n**Individual Transactions:**\n")
             for txn in transactions:
-                date_str = txn['date'][:10]  # Extract YYYY-MM-DD
-                if date_str not in by_date:
-                    by_date[date_str] = []
-                by_date[date_str].append(txn)
-            
-            response += "**Daily Breakdown:**\n"
-            for date_str in sorted(by_date.keys(), reverse=True):
-                day_total = sum(t['amount'] for t in by_date[date_str])
-                response += f"• {date_str}: ₹{day_total:,.2f} ({len(by_date[date_str])} txns)\n"
-        
-        state["messages"].append(AIMessage(content=response))
-        return state
-    if any(kw in query_lower for kw in [
-        "total spent", "how much spent", "spending", "expenses",
-        "remaining", "left", "balance", "budget status",
-        "monthly report", "spending report", "show spending",
-        "how much did i spend", "what did i spend", "spent for"
-    ]):
-        print(f"[FinanceHandler] → Spending report/analysis")
+                parts_append(f"• ₹{txn['amount']:.2f} - {txn['description']} ({txn['category']})\n")
         
-        # Extract category if mentioned
-        category = None
-        for cat in ["food", "transport", "shopping", "entertainment", "bills", "health", "education"]:
-            if cat in query_lower:
-                category = cat
-                break
+        response = "".join(parts)
+    
+    state["messages"].append(AIMessage(content=response))
+    return state
+
+
+@db_guarded()
+async def _handle_yesterday(state: AgentState, req: _FinanceRequest) -> AgentState:
+    print(f"[FinanceHandler] → Daily spending report (YESTERDAY)")
+    
+    summary, _ = await _fetch_daily(req, req.today_start - timedelta(days=1))
+    
+    if summary['total'] == 0:
+        response = "You didn't log any transactions yesterday."
+    else:
+        parts = [
+            "📅 **Yesterday's Spending Report**\n\n",
+            f"**Total spent:** ₹{summary['total']:,.2f}\n",
+            f"**Transactions:** {summary['transaction_count']}\n\n",
+        ]
+        parts_append = parts.append
         
-        # Get spending data
-        try:
-            spending_data = analyzer.get_monthly_spending(user_id, category)
-            budget_status = analyzer.check_budget_status(user_id)
-        except Exception as e:
-            print(f"[FinanceHandler] ❌ Database error: {e}")
-            state["messages"].append(
-                AIMessage(content="⚠️ I'm having trouble accessing your financial data. Please try again in a moment.")
-            )
-            return state
+        if summary['by_category']:
+            parts_append("**By category:**\n")
+            for item in summary['by_category']:
+                parts_append(f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f}\n")
         
-        if not spending_data:
-            response = "You haven't logged any transactions yet this month."
-        else:
-            # Generate response
-            total = sum(item['total_spent'] for item in spending_data)
-            response = f"📊 **Spending Summary**\n\n"
-            response += f"**Total spent this month:** ₹{total:,.2f}\n\n"
-            
-            if spending_data:
-                response += "**By category:**\n"
-                for item in spending_data:
-                    response += f"• {item['category'].capitalize()}: ₹{item['total_spent']:,.2f} ({item['transaction_count']} transactions)\n"
-            
-            # Add budget status if available
-            if budget_status:
-                response += "\n**Budget Status:**\n"
-                for item in budget_status:
-                    cat = item['category'].capitalize()
-                    used = item['usage_percent']
-                    spent = item['spent']
-                    budget = item['budget']
-                    remaining = budget - spent
-                    
-                    if used >= 100:
-                        emoji = "🚨"
-                    elif used >= 75:
-                        emoji = "⚠️"
-                    else:
-                        emoji = "✅"
-                    
-                    response += f"{emoji} {cat}: ₹{spent:,.2f} / ₹{budget:,.2f} ({used:.1f}% used, ₹{remaining:,.2f} remaining)\n"
+        response = "".join(parts)
+    
+    state["messages"].append(AIMessage(content=response))
+    return state
+
+
+@db_guarded()
+async def _handle_week(state: AgentState, req: _FinanceRequest) -> AgentState:
+    print(f"[FinanceHandler] → Weekly spending report")
+    
+    end_date = req.now
+    start_date = end_date - timedelta(days=7)
+    
+    days = await asyncio.to_thread(
+        get_spending_cache().get_or_load, (req.user_id, "date_range_summary", end_date.date()),
+        req.analyzer.get_date_range_summary, req.user_id, start_date, end_date
+    )
+    
+    if not days:
+        response = "No transactions in the last 7 days."
+    else:
+        # Per-day totals are aggregated in Neo4j, newest first
+        total = sum(day['total'] for day in days)
+        count = sum(day['count'] for day in days)
         
-        state["messages"].append(AIMessage(content=response))
-        return state
-   
-    if any(kw in query_lower for kw in [
-        "spent", "paid", "bought", "purchased", "cost", "rupees", "₹", "rs"
-    ]):
-        transaction = parse_transaction(last_message)
+        parts = [
+            "📊 **Last 7 Days Spending**\n\n",
+            f"**Total:** ₹{total:,.2f} ({count} transactions)\n\n",
+            "**Daily Breakdown:**\n",
+        ]
+        parts_append = parts.append
+        for day in days:
+            parts_append(f"• {day['date']}: ₹{day['total']:,.2f} ({day['count']} txns)\n")
         
-        if transaction and transaction.amount > 0:  # ✅ Check for valid amount
-            # Store transaction WITH ERROR HANDLING
-            try:
-                success = finance_db.add_transaction(user_id, transaction.model_dump())
-            except Exception as e:
-                print(f"[FinanceHandler] ❌ Transaction storage failed: {e}")
-                success = False
-            
-            if success:
-                print(f"[FinanceHandler] ✅ Transaction logged: ₹{transaction.amount}")
-                
-                # Check budget after transaction
-                try:
-                    budget_status = analyzer.check_budget_status(user_id)
-                    alert = alert_gen.generate_alert(budget_status)
-                except Exception as e:
-                    print(f"[FinanceHandler] ⚠️ Budget check failed: {e}")
-                    alert = None
-                
-                response = f"✅ Transaction logged: ₹{transaction.amount} for {transaction.description}"
-                
-                if transaction.category:
-                    response += f" ({transaction.category})"
-                
-                if alert:
-                    response += f"\n\n{alert}"
-                
-                state["messages"].append(AIMessage(content=response))
-                state["transaction_data"] = transaction.model_dump()
-                state["alert_message"] = alert
-            else:
-                state["messages"].append(
-                    AIMessage(content="❌ Failed to log transaction due to a database error. Please try again.")
-                )
-        else:
-            # Couldn't parse a valid transaction
-            state["messages"].append(
-                AIMessage(content="I couldn't understand that as a transaction. Please try: 'Spent 50 on tea' or 'Paid 200 for auto'")
-            )
+        response = "".join(parts)
+    
+    state["messages"].append(AIMessage(content=response))
+    return state
+
+
+@db_guarded("⚠️ I'm having trouble accessing your financial data. Please try again in a moment.")
+async def _handle_monthly_report(state: AgentState, req: _FinanceRequest) -> AgentState:
+    print(f"[FinanceHandler] → Spending report/analysis")
+    
+    # Extract category if mentioned
+    category_match = CATEGORY_RE.search(req.query_lower)
+    category = category_match.group(1) if category_match else None
+    
+    cache = get_spending_cache()
+    month_key = req.now.strftime("%Y-%m")
+    
+    # Spending and budget status come back from a single query, shared
+    # with any other reports requested in the same few milliseconds
+    spending_data, budget_status, total = await cache.aget_or_load(
+        (req.user_id, "spending_and_budget", category, month_key),
+        get_spending_batcher(req.finance_db.kg).get_spending, req.user_id, category, req.now
+    )
+    
+    if not spending_data:
+        response = "You haven't logged any transactions yet this month."
+    else:
+        # Keep the message terse; the full markdown is rendered from
+        # report_data only for the user-facing reply
+        state["report_data"] = {
+            "total": total,
+            "by_category": spending_data,
+            "budget_status": budget_status or [],
+        }
+        response = f"Spent ₹{total:,.2f} this month across {len(spending_data)} categories."
+    
+    state["messages"].append(AIMessage(content=response))
+    return state
+
+
+async def _handle_transaction(state: AgentState, req: _FinanceRequest) -> AgentState:
+    # "I paid attention" etc. can't be a transaction; skip the LLM call
+    if _AMOUNT_RE.search(req.message):
+        transaction = await asyncio.to_thread(parse_transaction, req.message)
     else:
-        # Not a transaction or spending query
+        transaction = None
+    
+    if not (transaction and transaction.amount > 0):  # ✅ Check for valid amount
+        # Couldn't parse a valid transaction
         state["messages"].append(
-            AIMessage(content="I can help you track transactions or check your spending. Try:\n• 'Spent 50 on tea'\n• 'How much did I spend this month?'\n• 'Show my budget status'")
+            AIMessage(content="I couldn't understand that as a transaction. Please try: 'Spent 50 on tea' or 'Paid 200 for auto'")
         )
+        return state
+    
+    txn_dump = transaction.model_dump()
+    amount = transaction.amount
+    description = transaction.description
+    category = transaction.category
     
+    # Store transaction and read back budget status in one round-trip
+    try:
+        success, budget_status = await asyncio.to_thread(
+            req.finance_db.add_transaction_and_status, req.user_id, txn_dump
+        )
+    except Exception as e:
+        print(f"[FinanceHandler] ❌ Transaction storage failed: {e}")
+        success, budget_status = False, []
+    
+    if not success:
+        state["messages"].append(
+            AIMessage(content="❌ Failed to log transaction due to a database error. Please try again.")
+        )
+        return state
+    
+    print(f"[FinanceHandler] ✅ Transaction logged: ₹{amount}")
+    get_spending_cache().invalidate_user(req.user_id)
+    
+    alert = _ALERT_GEN.generate_alert(budget_status)
+    
+    response = f"✅ Transaction logged: ₹{amount} for {description}"
+    
+    if category:
+        response += f" ({category})"
+    
+    if alert:
+        response += f"\n\n{alert}"
+    
+    state["messages"].append(AIMessage(content=response))
+    state["transaction_data"] = txn_dump
+    state["alert_message"] = alert
     return state
 
 
-def handle_budget_setup(state: AgentState, kg_conn, user_id: str) -> AgentState:
-    """Handle budget creation/update with IMPROVED ERROR HANDLING"""
+async def _handle_fallback(state: AgentState, req: _FinanceRequest) -> AgentState:
+    # Not a transaction or spending query
+    state["messages"].append(
+        AIMessage(content="I can help you track transactions or check your spending. Try:\n• 'Spent 50 on tea'\n• 'How much did I spend this month?'\n• 'Show my budget status'")
+    )
+    return state
+
+
+@functools.lru_cache(maxsize=1024)
+def classify_intent(query_lower: str) -> Optional[str]:
+    """
+    Classify a lowercased finance query
     
-    last_message = state.get("messages", [])[-1].content
+    Returns:
+        INTENT_HANDLERS key, or None for the fallback handler
+    """
+    match = INTENT_RE.match(query_lower)
+    return match.lastgroup if match else None
+
+
+# classify_intent() result -> handler
+INTENT_HANDLERS = {
+    "today": _handle_today,
+    "yesterday": _handle_yesterday,
+    "week": _handle_week,
+    "report": _handle_monthly_report,
+    "txn": _handle_transaction,
+}
+
+
+async def finance_transaction_handler(state: AgentState, kg_conn, user_id: str) -> AgentState:
+    """Handle finance-related queries and transactions with IMPROVED QUERY DETECTION"""
     
-    # Use LLM to parse budget intent
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+    messages = state.get("messages", [])
+    last_message = messages[-1].content if messages else ""
     
-    budget_prompt = ChatPromptTemplate.from_messages([
-        ("system", """
-Extract budget settings from user message.
+    finance_db = get_finance_db()
+    query_lower = last_message.lower()
+    now = datetime.now()
+    
+    req = _FinanceRequest(
+        user_id=user_id,
+        message=last_message,
+        query_lower=query_lower,
+        finance_db=finance_db,
+        analyzer=get_spending_analyzer(finance_db.kg),
+        now=now,
+        today_start=now.replace(hour=0, minute=0, second=0, microsecond=0),
+    )
+    
+    handler = INTENT_HANDLERS.get(classify_intent(query_lower), _handle_fallback)
+    return await handler(state, req)
 
-RULES:
-- Category must be one of: food, transport, shopping, entertainment, bills, health, education, other
-- Limit must be a positive number in INR
 
-Examples:
-- "Set food budget to 5000" → category: food, limit: 5000
-- "My transport budget is 2000 monthly" → category: transport, limit: 2000
-- "budget is 500 on food for this month" → category: food, limit: 500
-- "change food budget to 3000" → category: food, limit: 3000
-"""),
-        ("human", "{message}")
-    ])
+async def handle_budget_setup(state: AgentState, kg_conn, user_id: str) -> AgentState:
+    """Handle budget creation/update with IMPROVED ERROR HANDLING"""
     
-    chain = budget_prompt | llm.with_structured_output(BudgetIntent)
+    last_message = state.get("messages", [])[-1].content
     
     try:
-        budget_intent = chain.invoke({"message": last_message})
+        budget_intent = _parse_budget_fast(last_message)
+        if budget_intent is None:
+            budget_intent = await _budget_chain().ainvoke({"message": last_message})
         
-        from db_.neo4j_finance import get_finance_db
         finance_db = get_finance_db()
         
         try:
-            success = finance_db.set_budget(
+            success = await asyncio.to_thread(
+                finance_db.set_budget,
                 user_id=user_id,
                 category=budget_intent.category,
                 monthly_limit=budget_intent.limit
@@ -295,6 +482,7 @@ Examples:
         
         if success: 
             print(f"[BudgetSetup] ✅ Budget set: {budget_intent.category} = ₹{budget_intent.limit}")
+            get_spending_cache().invalidate_user(user_id)
             response = (
                 f"✅ Budget set successfully!\n"
                 f"   Category: {budget_intent.category.capitalize()}\n"
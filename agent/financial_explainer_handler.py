@@ -5,56 +5,62 @@ Integrates with existing finance tracking system
 """
 
 from agent.class_agent import AgentState
+from financial_explainer.concept_explainer import get_concept_explainer
+from financial_explainer.language_handler import get_language_handler
+from smart_budget_manager.spending_analyser import get_spending_analyzer
+from smart_budget_manager.spending_cache import get_spending_cache
+from db_.neo4j_finance import get_finance_db
 from langchain_core.messages import AIMessage
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
+from datetime import datetime
+import asyncio
+import functools
+import re
 
 
-def handle_concept_explanation(state: AgentState, user_id: str) -> AgentState:
+# Concept keywords
+CONCEPT_KEYWORDS = (
+    'what is', 'what are', 'explain', 'tell me about',
+    'how does', 'what does', 'meaning of',
+    'fd', 'fixed deposit', 'mutual fund', 'sip', 'ppf',
+    'elss', 'nps', 'insurance', 'term insurance',
+    'should i invest', 'is it good'
+)
+
+# One scan for all keywords. Anchored at word starts so short acronyms
+# don't fire inside other words ("sip" in "gossip"), but left open at the
+# end so "explained" or "insurances" still match
+_CONCEPT_RE = re.compile(r"\b(?:" + "|".join(re.escape(kw) for kw in CONCEPT_KEYWORDS) + ")")
+
+
+def _load_spending_data(user_id: str) -> Dict[str, Any]:
     """
-    Handle financial concept explanation queries WITH LANGUAGE DETECTION
+    Summarize the user's current month for the explainer
     
-    Args:
-        state: Current agent state
-        user_id: User identifier
-        
     Returns:
-        Updated agent state with explanation in user's language
+        Dict with total_spent, by_category and (estimated) income;
+        generic sample data if the finance DB is unavailable
     """
-    from financial_explainer.concept_explainer import get_concept_explainer
-    from financial_explainer.language_handler import get_language_handler
-    from smart_budget_manager.spending_analyser import SpendingAnalyzer
-    from db_.neo4j_finance import get_finance_db
-    
-    messages = state.get("messages", [])
-    query = messages[-1].content if messages else ""
-    
-    print(f"[ConceptExplainer] Processing query: {query}")
-    
-    # Detect language preference
-    language_handler = get_language_handler()
-    lang_detection = language_handler.detect_language(query)
-    
-    print(f"[ConceptExplainer] Language: {lang_detection.primary_language} ({lang_detection.script})")
-    print(f"[ConceptExplainer] Will respond in: {lang_detection.should_respond_in}")
-    
-    # Get user's spending data
     try:
         finance_db = get_finance_db()
-        analyzer = SpendingAnalyzer(finance_db.kg)
+        analyzer = get_spending_analyzer(finance_db.kg)
         
-        # Get spending summary
-        spending_summary = analyzer.get_monthly_spending(user_id)
-        budget_status = analyzer.check_budget_status(user_id)
+        # Get spending summary and budget status in one round-trip; shares
+        # cache entries with the finance handler's monthly report
+        now = datetime.now()
+        spending_summary, budget_status, total_spent = get_spending_cache().get_or_load(
+            (user_id, "spending_and_budget", None, now.strftime("%Y-%m")),
+            analyzer.get_spending_and_budget, user_id, None, now
+        )
         
         # Format spending data for explainer
-        total_spent = sum(item['total_spent'] for item in spending_summary) if spending_summary else 0
         by_category = {item['category']: item['total_spent'] for item in spending_summary} if spending_summary else {}
         
         # Estimate income (you might want to store this in user profile)
         # For now, we'll estimate based on budget limits
         estimated_income = sum(item['budget'] for item in budget_status) if budget_status else total_spent * 1.5
         
-        spending_data = {
+        return {
             'total_spent': total_spent,
             'by_category': by_category,
             'income': estimated_income
@@ -63,17 +69,90 @@ def handle_concept_explanation(state: AgentState, user_id: str) -> AgentState:
     except Exception as e:
         print(f"[ConceptExplainer] ⚠️ Could not fetch spending data: {e}")
         # Fallback to generic data
-        spending_data = {
+        return {
             'total_spent': 15000,
             'by_category': {'food': 5000, 'transport': 3000, 'shopping': 4000},
             'income': 30000
         }
+
+
+async def _detect_language_and_load(language_handler, query: str, user_id: str):
+    """Run language detection and the spending fetch concurrently"""
+    # Language detection may call the LLM; both are independent blocking calls
+    lang_detection, spending_data = await asyncio.gather(
+        asyncio.to_thread(language_handler.detect_language, query),
+        asyncio.to_thread(_load_spending_data, user_id),
+    )
+    
+    print(f"[ConceptExplainer] Language: {lang_detection.primary_language} ({lang_detection.script})")
+    print(f"[ConceptExplainer] Will respond in: {lang_detection.should_respond_in}")
+    return lang_detection, spending_data
+
+
+async def stream_concept_explanation(query: str, user_id: str) -> AsyncIterator[str]:
+    """
+    Stream a concept explanation section by section
+    
+    The first section goes out as soon as the explanation is generated;
+    Hinglish sections follow as each one is translated.
+    
+    Args:
+        query: User's question
+        user_id: User identifier
+        
+    Yields:
+        Markdown fragments that concatenate to the handle_concept_explanation reply
+    """
+    language_handler = get_language_handler()
+    lang_detection, spending_data = await _detect_language_and_load(language_handler, query, user_id)
+    
+    try:
+        explanation = await asyncio.to_thread(
+            get_concept_explainer().explain_concept,
+            concept_query=query,
+            user_spending_data=spending_data
+        )
+        sections = language_handler.iter_vernacular_response(
+            explanation=explanation.model_dump(),
+            language_pref=lang_detection.should_respond_in,
+            spending_data=spending_data
+        )
+        
+        # Each section may block on a translation call
+        while (section := await asyncio.to_thread(next, sections, None)) is not None:
+            yield section
+            
+    except Exception as e:
+        print(f"[ConceptExplainer] ❌ Stream error: {e}")
+        yield "I'm having trouble explaining that concept right now. Could you rephrase your question?"
+
+
+async def handle_concept_explanation(state: AgentState, user_id: str) -> AgentState:
+    """
+    Handle financial concept explanation queries WITH LANGUAGE DETECTION
+    
+    Args:
+        state: Current agent state
+        user_id: User identifier
+        
+    Returns:
+        Updated agent state with explanation in user's language
+    """
+    messages = state.get("messages", [])
+    query = messages[-1].content if messages else ""
+    
+    print(f"[ConceptExplainer] Processing query: {query}")
+    
+    language_handler = get_language_handler()
+    lang_detection, spending_data = await _detect_language_and_load(language_handler, query, user_id)
     
     # Get explanation
     explainer = get_concept_explainer()
     
     try:
-        explanation = explainer.explain_concept(
+        # Needs spending_data for personalization, so it can't join the gather
+        explanation = await asyncio.to_thread(
+            explainer.explain_concept,
             concept_query=query,
             user_spending_data=spending_data
         )
@@ -81,8 +160,9 @@ def handle_concept_explanation(state: AgentState, user_id: str) -> AgentState:
         # Format response in user's preferred language
         print(f"[ConceptHandler] Formatting response in: {lang_detection.should_respond_in}")
         
+        explanation_dict = explanation.model_dump()
         response = language_handler.format_vernacular_response(
-            explanation=explanation.model_dump(),
+            explanation=explanation_dict,
             language_pref=lang_detection.should_respond_in,
             spending_data=spending_data
         )
@@ -112,31 +192,31 @@ def format_explanation_response(explanation, spending_data: Dict[str, Any]) -> s
     Returns:
         Formatted response string
     """
-    response = f"💡 **Understanding {explanation.concept}**\n\n"
-    
-    # Simple explanation
-    response += f"**What it means:**\n{explanation.simple_explanation}\n\n"
-    
-    # Personalized context
-    response += f"**For your situation:**\n{explanation.personalized_context}\n\n"
+    parts = [
+        f"💡 **Understanding {explanation.concept}**\n\n",
+        # Simple explanation
+        f"**What it means:**\n{explanation.simple_explanation}\n\n",
+        # Personalized context
+        f"**For your situation:**\n{explanation.personalized_context}\n\n",
+    ]
+    parts_append = parts.append
     
     # Practical example
     if explanation.practical_example:
-        response += f"**Practical Example:**\n{explanation.practical_example}\n\n"
+        parts_append(f"**Practical Example:**\n{explanation.practical_example}\n\n")
     
     # Key points
     if explanation.key_points:
-        response += "**Key Points to Remember:**\n"
-        for i, point in enumerate(explanation.key_points, 1):
-            response += f"{i}. {point}\n"
-        response += "\n"
+        parts_append("**Key Points to Remember:**\n")
+        parts.extend(f"{i}. {point}\n" for i, point in enumerate(explanation.key_points, 1))
+        parts_append("\n")
     
     # Personalized recommendation
-    response += f"**My Suggestion:**\n{explanation.recommendation}\n"
+    parts_append(f"**My Suggestion:**\n{explanation.recommendation}\n")
     
     # Risk note if applicable
     if explanation.risk_note:
-        response += f"\n {explanation.risk_note}\n"
+        parts_append(f"\n {explanation.risk_note}\n")
     
     # Add spending summary
     total = spending_data.get('total_spent', 0)
@@ -144,11 +224,11 @@ def format_explanation_response(explanation, spending_data: Dict[str, Any]) -> s
     if total > 0:
         savings = income - total
         savings_rate = (savings / income * 100) if income > 0 else 0
-        response += f"\n📊 **Your Current Finances:**\n"
-        response += f"• Monthly Spending: ₹{total:,.0f}\n"
-        response += f"• Estimated Savings: ₹{savings:,.0f} ({savings_rate:.1f}%)\n"
+        parts_append(f"\n📊 **Your Current Finances:**\n")
+        parts_append(f"• Monthly Spending: ₹{total:,.0f}\n")
+        parts_append(f"• Estimated Savings: ₹{savings:,.0f} ({savings_rate:.1f}%)\n")
     
-    return response
+    return "".join(parts)
 
 
 def should_explain_concept(query: str) -> bool:
@@ -161,15 +241,9 @@ def should_explain_concept(query: str) -> bool:
     Returns:
         True if query is asking about a financial concept
     """
-    query_lower = query.lower()
-    
-    # Concept keywords
-    concept_keywords = [
-        'what is', 'what are', 'explain', 'tell me about',
-        'how does', 'what does', 'meaning of',
-        'fd', 'fixed deposit', 'mutual fund', 'sip', 'ppf',
-        'elss', 'nps', 'insurance', 'term insurance',
-        'should i invest', 'is it good'
-    ]
-    
-    return any(keyword in query_lower for keyword in concept_keywords)
\ No newline at end of file
+    return _is_concept_query(query.strip().lower())
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_concept_query(query_lower: str) -> bool:
+    return _CONCEPT_RE.search(query_lower) is not None
\ No newline at end of file
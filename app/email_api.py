@@ -4,8 +4,10 @@ Add to backend/app/main.py
 """
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
+import orjson
 
 # Create router
 email_router = APIRouter(prefix="/email", tags=["Email Scam Detection"])
@@ -13,6 +15,8 @@ email_router = APIRouter(prefix="/email", tags=["Email Scam Detection"])
 
 class EmailScanRequest(BaseModel):
     """Request model for email scanning"""
+    model_config = ConfigDict(frozen=True)
+    
     user_id: str = "default_user"
     hours_ago: int = 24
     max_emails: int = 10
@@ -26,7 +30,7 @@ class SingleEmailCheckRequest(BaseModel):
 
 
 @email_router.post("/scan")
-def scan_emails(request: EmailScanRequest):
+async def scan_emails(request: EmailScanRequest):
     """
     Scan recent emails for scams
     
@@ -47,9 +51,9 @@ def scan_emails(request: EmailScanRequest):
         }
     """
     try:
-        from email_scam_handler import handle_email_scam_check
+        from email_scam_handler import ahandle_email_scam_check
         
-        result = handle_email_scam_check(
+        result = await ahandle_email_scam_check(
             user_id=request.user_id,
             hours_ago=request.hours_ago,
             max_emails=request.max_emails
@@ -61,7 +65,9 @@ def scan_emails(request: EmailScanRequest):
                 detail=result.get("message", "Email scan failed")
             )
         
-        return result
+        # Returning a Response skips FastAPI's jsonable_encoder walk over
+        # every result dict; orjson serializes the dicts/tuples directly
+        return ORJSONResponse(result)
         
     except Exception as e:
         raise HTTPException(
@@ -70,6 +76,45 @@ def scan_emails(request: EmailScanRequest):
         )
 
 
+@email_router.post("/scan/stream")
+def scan_emails_stream(request: EmailScanRequest):
+    """
+    Scan recent emails for scams, streamed as NDJSON
+    
+    The first line is the scan summary (same fields as /email/scan minus
+    "results"); every following line is one email result. Large scans
+    are serialized one result at a time instead of as one big list.
+    
+    Args:
+        request: EmailScanRequest with scan parameters
+        
+    Returns:
+        application/x-ndjson stream
+    """
+    from email_scam_handler import iter_email_scam_check
+    
+    stream = iter_email_scam_check(
+        user_id=request.user_id,
+        hours_ago=request.hours_ago,
+        max_emails=request.max_emails
+    )
+    
+    # Run the scan before the response starts so failures still get a status code
+    header = next(stream)
+    if not header.get("success"):
+        raise HTTPException(
+            status_code=400,
+            detail=header.get("message", "Email scan failed")
+        )
+    
+    def lines():
+        yield orjson.dumps(header) + b"\n"
+        for result in stream:
+            yield orjson.dumps(result) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @email_router.post("/check-single")
 def check_single_email(request: SingleEmailCheckRequest):
     """
@@ -106,7 +151,7 @@ def check_single_email(request: SingleEmailCheckRequest):
                 detail=result.get("error", "Analysis failed")
             )
         
-        return result
+        return ORJSONResponse(result)
         
     except Exception as e:
         raise HTTPException(
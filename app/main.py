@@ -1,9 +1,103 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.query import query_router
+from app.email_api import email_router
+from db_.neo4j_finance import get_finance_db
+from scam_detector.scam_detector import get_scam_detector
+from settings import get_settings
 from contextlib import asynccontextmanager
-import os
-import sys
+import asyncio
+import logging
+import orjson
+
+settings = get_settings()
+
+# LOG_LEVEL=DEBUG turns on per-request routing logs
+logging.basicConfig(level=settings.log_level, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+__all__ = ["app"]
+
+# Set ENABLE_SCAM_DETECTOR=0 to skip loading the detector at startup
+ENABLE_SCAM_DETECTOR = settings.enable_scam_detector
+
+# Set once the deferred startup work has finished successfully
+_ready = asyncio.Event()
+
+# Phase -> error message for required services that failed to initialize;
+# cleared once a retry succeeds
+_init_errors: dict = {}
+
+# Finance DB init retry delay in seconds: doubles after each failure up to the cap
+FINANCE_DB_RETRY_DELAY = 1.0
+FINANCE_DB_RETRY_MAX_DELAY = 30.0
+
+
+def _init_finance_db():
+    finance_db = get_finance_db()
+    
+    if not finance_db.verify_connection():
+        raise Exception("Finance DB connection failed")
+    finance_db.warm_up()
+    return finance_db
+
+
+def _init_scam_detector():
+    return get_scam_detector()
+
+
+def _phase_status(result) -> str:
+    return f"failed: {result}" if isinstance(result, Exception) else "ok"
+
+
+async def _retry_finance_db() -> None:
+    """Retry finance DB init with backoff until it succeeds, then mark the app ready"""
+    delay = FINANCE_DB_RETRY_DELAY
+    while True:
+        logger.warning("⚠️ Finance DB unavailable, retrying in %.0fs: %s", delay, _init_errors["finance_db"])
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.to_thread(_init_finance_db)
+        except Exception as e:
+            _init_errors["finance_db"] = str(e)
+            delay = min(delay * 2, FINANCE_DB_RETRY_MAX_DELAY)
+            continue
+        
+        _init_errors.pop("finance_db", None)
+        _ready.set()
+        logger.info("🚀 FinGuard ready (finance DB recovered)")
+        return
+
+
+async def _deferred_init():
+    """Warm the finance DB and scam detector, then mark the app ready"""
+    # The DB and detector don't depend on each other, so warm them up in
+    # parallel; startup takes as long as the slowest one
+    inits = [asyncio.to_thread(_init_finance_db)]
+    if ENABLE_SCAM_DETECTOR:
+        inits.append(asyncio.to_thread(_init_scam_detector))
+    finance_result, *detector_result = await asyncio.gather(*inits, return_exceptions=True)
+    
+    phases = {
+        "env": "ok",
+        "finance_db": _phase_status(finance_result),
+        "scam_detector": _phase_status(detector_result[0]) if ENABLE_SCAM_DETECTOR else "disabled",
+        "knowledge_graph": "lazy",
+    }
+    
+    # The scam detector is optional; without the finance DB the app can't
+    # serve, so stay unready (and let /health/ready report why) until a
+    # retry gets through, e.g. after a brief Neo4j outage at boot
+    if isinstance(finance_result, Exception):
+        _init_errors["finance_db"] = str(finance_result)
+        logger.error("❌ FinGuard startup failed %s", phases, extra={"phases": phases})
+        await _retry_finance_db()
+        return
+    
+    _ready.set()
+    logger.info("🚀 FinGuard ready %s", phases, extra={"phases": phases})
+
 
 # Startup/shutdown lifecycle
 @asynccontextmanager
@@ -11,69 +105,25 @@ async def lifespan(app: FastAPI):
     """
     Initialize services on startup, cleanup on shutdown
     """
-    print("\n" + "="*60)
-    print("🚀 FINGUARD STARTUP")
-    print("="*60)
-    
-    print("\n[Phase 1] Validating environment variables...")
-    
-    required_vars = [
-        "GROQ_API_KEY",
-        "GOOGLE_API_KEY", 
-        "NEO4J_URI",
-        "NEO4J_USERNAME",
-        "NEO4J_PASSWORD",
-        "NEO4J_URI2",
-        "NEO4J_USERNAME2", 
-        "NEO4J_PASSWORD2"
-    ]
-    
-    missing = [var for var in required_vars if not os.getenv(var)]
-    
+    missing = settings.missing_vars
     if missing:
-        print(f"❌ FATAL: Missing environment variables: {missing}")
-        print("💡 Add these in Render Dashboard → Environment → Environment Variables")
-        sys.exit(1)
-    
-    print("✅ All required environment variables present")
+        logger.error(
+            "❌ FATAL: Missing environment variables: %s "
+            "(add them in Render Dashboard → Environment → Environment Variables)",
+            list(missing)
+        )
+        raise SystemExit(1)
     
-    print("\n[Phase 2] Initializing Finance Database...")
-    
-    try:
-        from db_.neo4j_finance import get_finance_db
-        finance_db = get_finance_db()
-        
-        if not finance_db.verify_connection():
-            raise Exception("Finance DB connection failed")
-        
-        print("✅ Finance Database ready")
-        
-    except Exception as e:
-        print(f"❌ Finance DB initialization failed: {e}")
-        print("⚠️  Finance features will be unavailable")
-   
-    print("\n[Phase 3] Initializing Scam Detector...")
-    
-    try:
-        from scam_detector.scam_detector import get_scam_detector
-        detector = get_scam_detector()
-        print("✅ Scam Detector ready")
-    except Exception as e:
-        print(f"⚠️  Scam Detector initialization failed: {e}")
-
-
-    print("\n[Phase 4] Knowledge Graph...")
-    print("✅ Will initialize on first query (lazy loading)")
-    print("ℹ️  This avoids blocking startup")
-
-    print("\n" + "="*60)
-    print("✅ FINGUARD READY TO SERVE")
-    print("="*60 + "\n")
+    # Heavy init runs after the port is bound; /health/ready reports 503
+    # until it finishes. The knowledge graph initializes on first query.
+    _ready.clear()
+    _init_errors.clear()
+    init_task = asyncio.create_task(_deferred_init())
     
     yield
 
-    print("\n🛑 Shutting down FinGuard...")
-    print("✅ Cleanup complete\n")
+    init_task.cancel()
+    logger.info("🛑 FinGuard shut down")
 
 
 # Create FastAPI app
@@ -81,55 +131,76 @@ app = FastAPI(
     title="FinGuard API",
     description="AI-powered financial assistant for Indian users",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS configuration
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
+# CORS configuration; set ALLOWED_ORIGINS in production so origins are
+# checked against a fixed list instead of echoing any caller
+allowed_origins = list(settings.allowed_origins)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["*"],
+    allow_headers=["Accept", "Authorization", "Content-Type"],
 )
 
 # Include routers
 app.include_router(query_router) 
 
 # Include email router
-try:
-    from app.email_api import email_router
-    app.include_router(email_router)
-    print("[Main] ✅ Email API loaded")
-except ImportError as e:
-    print(f"[Main] ⚠️ Email API not available: {e}")
+app.include_router(email_router)
+
+# Health probe bodies never change, so serialize them once
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "service": "FinGuard",
+    "version": "1.0.0",
+    "features": {
+        "government_schemes": True,
+        "finance_tracking": True,
+        "scam_detection": True,
+        "concept_explanation": True,
+        "email_scam_detection": True
+    }
+})
+
+_ROOT_JSON = orjson.dumps({
+    "message": "Welcome to FinGuard API",
+    "docs": "/docs",
+    "health": "/health",
+    "version": "1.0.0"
+})
 
 # Health check endpoint
-@app.get("/health")
+@app.api_route("/health", methods=["GET", "HEAD"])
 def health_check():
     """Health check endpoint for Render"""
-    return {
-        "status": "healthy",
-        "service": "FinGuard",
-        "version": "1.0.0",
-        "features": {
-            "government_schemes": True,
-            "finance_tracking": True,
-            "scam_detection": True,
-            "concept_explanation": True,
-            "email_scam_detection": True
-        }
-    }
+    return Response(content=_HEALTH_JSON, media_type="application/json")
+
+@app.get("/health/live")
+def health_live():
+    """Liveness probe: the process is up and serving"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Readiness probe: 503 until the finance DB is up and warm-up has finished
+    
+    A scam detector failure doesn't block readiness; a finance DB failure
+    reports "failed" while startup keeps retrying in the background.
+    """
+    if _init_errors:
+        return ORJSONResponse({"status": "failed", "errors": _init_errors}, status_code=503)
+    if not _ready.is_set():
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
 
 # Root endpoint
-@app.get("/")
+@app.api_route("/", methods=["GET", "HEAD"])
 def root():
     """Root endpoint - API documentation"""
-    return {
-        "message": "Welcome to FinGuard API",
-        "docs": "/docs",
-        "health": "/health",
-        "version": "1.0.0"
-    }
\ No newline at end of file
+    return Response(content=_ROOT_JSON, media_type="application/json")
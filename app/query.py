@@ -1,7 +1,10 @@
 from feature_router.router import router_feature
+from agent.financial_explainer_handler import stream_concept_explanation
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+import json
 
 query_router = APIRouter()
 
@@ -23,7 +26,7 @@ class QueryResponse(BaseModel):
 
 
 @query_router.post("/query", response_model=QueryResponse)
-def query(request: QueryRequest):
+async def query(request: QueryRequest):
     """
     Main query endpoint for FinGuard.
     Routes to appropriate handler based on query content.
@@ -38,15 +41,38 @@ def query(request: QueryRequest):
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
     try:
-        response = router_feature({
+        # response_model validates and filters this dict once on the way
+        # out; building a QueryResponse here would validate it twice
+        return await router_feature({
             "query": request.query,
             "user_id": request.user_id
         })
-        return QueryResponse(**response)
         
     except Exception as e:
         print(f"[QueryEndpoint] Error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@query_router.post("/query/explain/stream")
+async def stream_explanation(request: QueryRequest):
+    """
+    Stream a financial concept explanation as server-sent events.
+    
+    Each event's data is a JSON-encoded markdown fragment; a final
+    `done` event marks the end of the answer.
+    
+    Args:
+        request: QueryRequest with the concept question and user_id
+    """
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    async def events():
+        async for section in stream_concept_explanation(request.query, request.user_id):
+            yield f"data: {json.dumps(section)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
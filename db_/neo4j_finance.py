@@ -1,8 +1,210 @@
 from langchain_neo4j import Neo4jGraph
+from neo4j import Result, RoutingControl
+from settings import get_settings
 from datetime import datetime
-import uuid
+from typing import List, Tuple
+import logging
+import threading
+import secrets
 import os
 
+logger = logging.getLogger(__name__)
+
+
+# One driver per process; sessions are borrowed from its pool per query.
+# Size the pool to the worker's concurrency via NEO4J_MAX_CONNECTION_POOL_SIZE
+# (Settings.neo4j_max_pool_size)
+DRIVER_CONFIG = {
+    "connection_acquisition_timeout": 30,
+}
+
+
+def run_read(kg: Neo4jGraph, query: str, params: dict = None) -> list:
+    """
+    Run a read-only Cypher statement through driver.execute_query.
+    
+    The driver retries transient failures, routes to a reader in cluster
+    mode and chains bookmarks so reads see earlier writes. Pass a constant
+    query string so Neo4j can reuse the cached plan.
+    
+    Returns:
+        List of record dicts (same shape as Neo4jGraph.query)
+    """
+    return kg._driver.execute_query(
+        query, params or {},
+        routing_=RoutingControl.READ,
+        database_=kg._database,
+        result_transformer_=Result.data,
+    )
+
+
+def run_write(kg: Neo4jGraph, query: str, params: dict = None) -> list:
+    """Run a Cypher statement through driver.execute_query on the leader"""
+    return kg._driver.execute_query(
+        query, params or {},
+        routing_=RoutingControl.WRITE,
+        database_=kg._database,
+        result_transformer_=Result.data,
+    )
+
+
+_CYPHER_ADD_TRANSACTION = """
+MERGE (u:User {id: $user_id})
+CREATE (t:Transaction {
+    id: $tx_id,
+    user_id: $user_id,
+    amount: $amount,
+    category: $category,
+    description: $description,
+    type: $type,
+    payment_mode: $payment_mode,
+    date: datetime($date),
+    created_at: datetime()
+})
+CREATE (u)-[:MADE_TRANSACTION]->(t)
+WITH t
+OPTIONAL MATCH (b:Budget {user_id: $user_id, category: $category})
+FOREACH (_ IN CASE WHEN b IS NOT NULL THEN [1] ELSE [] END |
+    CREATE (t)-[:BELONGS_TO]->(b)
+)
+RETURN t.id as transaction_id
+"""
+
+# _CYPHER_ADD_TRANSACTION for many rows in one round-trip; rows are built
+# by FinanceDB._transaction_params
+_CYPHER_ADD_TRANSACTIONS_BULK = """
+UNWIND $rows AS r
+MERGE (u:User {id: r.user_id})
+CREATE (t:Transaction {
+    id: r.tx_id,
+    user_id: r.user_id,
+    amount: r.amount,
+    category: r.category,
+    description: r.description,
+    type: r.type,
+    payment_mode: r.payment_mode,
+    date: datetime(r.date),
+    created_at: datetime()
+})
+CREATE (u)-[:MADE_TRANSACTION]->(t)
+WITH t, r
+OPTIONAL MATCH (b:Budget {user_id: r.user_id, category: r.category})
+FOREACH (_ IN CASE WHEN b IS NOT NULL THEN [1] ELSE [] END |
+    CREATE (t)-[:BELONGS_TO]->(b)
+)
+RETURN count(DISTINCT t) as saved
+"""
+
+# Same write as _CYPHER_ADD_TRANSACTION, then the budget status (same
+# semantics as SpendingAnalyzer.check_budget_status) in the same transaction
+_CYPHER_ADD_TRANSACTION_AND_STATUS = """
+MERGE (u:User {id: $user_id})
+CREATE (t:Transaction {
+    id: $tx_id,
+    user_id: $user_id,
+    amount: $amount,
+    category: $category,
+    description: $description,
+    type: $type,
+    payment_mode: $payment_mode,
+    date: datetime($date),
+    created_at: datetime()
+})
+CREATE (u)-[:MADE_TRANSACTION]->(t)
+WITH u, t
+OPTIONAL MATCH (b:Budget {user_id: $user_id, category: $category})
+FOREACH (_ IN CASE WHEN b IS NOT NULL THEN [1] ELSE [] END |
+    CREATE (t)-[:BELONGS_TO]->(b)
+)
+WITH DISTINCT u
+CALL {
+    WITH u
+    MATCH (u)-[:HAS_BUDGET]->(b:Budget)
+    OPTIONAL MATCH (u)-[:MADE_TRANSACTION]->(t:Transaction)
+    WHERE t.category = b.category
+      AND t.type = 'expense'
+    WITH b, sum(COALESCE(t.amount, 0)) as spent
+    WITH b, spent, (spent / b.monthly_limit * 100) as usage_percent
+    ORDER BY usage_percent DESC
+    RETURN collect({
+        category: b.category,
+        budget: b.monthly_limit,
+        spent: spent,
+        usage_percent: usage_percent
+    }) as budget_status
+}
+RETURN budget_status
+"""
+
+_CYPHER_VERIFY = "RETURN 1 as test"
+
+# index name -> DDL
+_CYPHER_CREATE_INDEXES = {
+    "user_id_idx": "CREATE INDEX user_id_idx IF NOT EXISTS FOR (u:User) ON (u.id)",
+    "transaction_user_date_idx": "CREATE INDEX transaction_user_date_idx IF NOT EXISTS FOR (t:Transaction) ON (t.user_id, t.date)",
+    "budget_user_category_idx": "CREATE INDEX budget_user_category_idx IF NOT EXISTS FOR (b:Budget) ON (b.user_id, b.category)",
+}
+
+_CYPHER_EXISTING_INDEXES = """
+SHOW INDEXES YIELD name
+WHERE name IN $names
+RETURN collect(name) as names
+"""
+
+# Touches every user's transactions and budgets once so the first real
+# query finds its pages in the page cache. Each count runs in its own CALL
+# so the two matches don't multiply into a transactions x budgets product
+_CYPHER_WARMUP = """
+CALL {
+    MATCH (:User)-[:MADE_TRANSACTION]->(t:Transaction)
+    RETURN count(t.amount) as transactions
+}
+CALL {
+    MATCH (:User)-[:HAS_BUDGET]->(b:Budget)
+    RETURN count(b.monthly_limit) as budgets
+}
+RETURN transactions, budgets
+"""
+
+_CYPHER_SET_BUDGET = """
+MERGE (u:User {id: $user_id})
+MERGE (b:Budget {user_id: $user_id, category: $category})
+ON CREATE SET b.created_at = datetime()
+SET b.monthly_limit = $monthly_limit,
+    b.currency = 'INR',
+    b.updated_at = datetime()
+MERGE (u)-[:HAS_BUDGET]->(b)
+RETURN b
+"""
+
+
+# Neo4jGraph owns a driver and its connection pool, so build it once per
+# process; every FinanceDB shares it (see _get_graph)
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def _get_graph() -> Neo4jGraph:
+    """Get or create the shared finance-database Neo4jGraph"""
+    global _graph
+    
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                settings = get_settings()
+                _graph = Neo4jGraph(
+                    url=settings.neo4j_uri2,
+                    username=settings.neo4j_username2,
+                    password=settings.neo4j_password2,
+                    # Naming the database spares the driver a home-db lookup per session
+                    database=settings.neo4j_database2,
+                    driver_config={**DRIVER_CONFIG, "max_connection_pool_size": settings.neo4j_max_pool_size}
+                )
+                print("[FinanceDB] ✅ Created NEW connection to finance database")
+                print(f"[FinanceDB]    Connected to: {settings.neo4j_uri2}")
+    
+    return _graph
+
 
 class FinanceDB:
     def __init__(self, kg_conn: Neo4jGraph = None):
@@ -14,14 +216,8 @@ class FinanceDB:
                     ⚠️ Should ALWAYS be None to use finance credentials!
         """
         if kg_conn is None:
-          
-            self.kg = Neo4jGraph(
-                url=os.getenv("NEO4J_URI2"),
-                username=os.getenv("NEO4J_USERNAME2"),
-                password=os.getenv("NEO4J_PASSWORD2")
-            )
-            print("[FinanceDB] ✅ Created NEW connection to finance database")
-            print(f"[FinanceDB]    Connected to: {os.getenv('NEO4J_URI2')}")
+            # Shared graph: extra FinanceDB instances reuse the same pool
+            self.kg = _get_graph()
         else:
           
             self.kg = kg_conn
@@ -33,13 +229,21 @@ class FinanceDB:
             
     def _create_indexes(self):
         """Create necessary indexes for performance"""
-        indexes = [
-            "CREATE INDEX user_id_idx IF NOT EXISTS FOR (u:User) ON (u.id)",
-            "CREATE INDEX transaction_user_date_idx IF NOT EXISTS FOR (t:Transaction) ON (t.user_id, t.date)",
-            "CREATE INDEX budget_user_category_idx IF NOT EXISTS FOR (b:Budget) ON (b.user_id, b.category)",
-        ]
+        # One round-trip to find what's already there; on a warm database
+        # this is the only call
+        try:
+            result = self.kg.query(_CYPHER_EXISTING_INDEXES, {"names": list(_CYPHER_CREATE_INDEXES)})
+            existing = set(result[0]["names"]) if result else set()
+        except Exception as e:
+            print(f"[FinanceDB] ⚠️ Could not list indexes: {e}")
+            existing = set()
+        
+        missing = [ddl for name, ddl in _CYPHER_CREATE_INDEXES.items() if name not in existing]
+        if not missing:
+            print("[FinanceDB] ✅ Indexes already present")
+            return
         
-        for index_query in indexes:
+        for index_query in missing:
             try:
                 self.kg.query(index_query)
                 print(f"[FinanceDB] ✅ Index: {index_query[:50]}...")
@@ -59,28 +263,78 @@ class FinanceDB:
         Returns:
             True if successful, False otherwise
         """
-        query = """
-        MERGE (u:User {id: $user_id})
-        CREATE (t:Transaction {
-            id: $tx_id,
-            user_id: $user_id,
-            amount: $amount,
-            category: $category,
-            description: $description,
-            type: $type,
-            payment_mode: $payment_mode,
-            date: datetime($date),
-            created_at: datetime()
-        })
-        CREATE (u)-[:MADE_TRANSACTION]->(t)
-        WITH t
-        OPTIONAL MATCH (b:Budget {user_id: $user_id, category: $category})
-        FOREACH (_ IN CASE WHEN b IS NOT NULL THEN [1] ELSE [] END |
-            CREATE (t)-[:BELONGS_TO]->(b)
-        )
-        RETURN t.id as transaction_id
+        params = self._transaction_params(user_id, transaction)
+        
+        try:
+            run_write(self.kg, _CYPHER_ADD_TRANSACTION, params)
+            self._log_saved(transaction, params["date"])
+            return True
+            
+        except Exception as e:
+            print(f"[FinanceDB] ❌ Transaction failed: {e}")
+            # Full traceback only when debug logging is on
+            logger.debug("Traceback:", exc_info=True)
+            return False
+    
+    def add_transaction_and_status(self, user_id: str, transaction: dict) -> Tuple[bool, list]:
+        """
+        Store a transaction and return the updated budget status in one round-trip
+        
+        Args:
+            user_id: User identifier
+            transaction: Transaction dictionary with amount, category, description, etc.
+            
+        Returns:
+            (success, budget_status) where budget_status has the same shape as
+            SpendingAnalyzer.check_budget_status(); ([] on failure)
         """
-      
+        params = self._transaction_params(user_id, transaction)
+        
+        try:
+            result = run_write(self.kg, _CYPHER_ADD_TRANSACTION_AND_STATUS, params)
+            self._log_saved(transaction, params["date"])
+            return True, (result[0]["budget_status"] if result else [])
+            
+        except Exception as e:
+            print(f"[FinanceDB] ❌ Transaction failed: {e}")
+            # Full traceback only when debug logging is on
+            logger.debug("Traceback:", exc_info=True)
+            return False, []
+    
+    def add_transactions_bulk(self, user_id: str, transactions: List[dict]) -> int:
+        """
+        Add many transactions for a user in a single write transaction
+        
+        Args:
+            user_id: User identifier
+            transactions: Transaction dicts, same shape as add_transaction()
+            
+        Returns:
+            Number of transactions saved (0 on failure; the batch is all-or-nothing)
+        """
+        if not transactions:
+            return 0
+        
+        # One urandom read for the whole batch, sliced into 32-char hex ids
+        ids = os.urandom(16 * len(transactions)).hex()
+        rows = [
+            self._transaction_params(user_id, txn, ids[i * 32:(i + 1) * 32])
+            for i, txn in enumerate(transactions)
+        ]
+        
+        try:
+            result = run_write(self.kg, _CYPHER_ADD_TRANSACTIONS_BULK, {"rows": rows})
+            saved = result[0]["saved"] if result else 0
+            print(f"[FinanceDB] ✅ Saved {saved} transactions for user {user_id}")
+            return saved
+            
+        except Exception as e:
+            print(f"[FinanceDB] ❌ Bulk insert of {len(rows)} transactions failed: {e}")
+            return 0
+    
+    @staticmethod
+    def _transaction_params(user_id: str, transaction: dict, tx_id: str = None) -> dict:
+        """Normalize the transaction date and build the Cypher parameters"""
         transaction_date = transaction.get("date")
         
         if not transaction_date or transaction_date == "":
@@ -90,53 +344,39 @@ class FinanceDB:
             try:
                 # Parse the date string and convert to datetime
                 if "T" not in transaction_date: 
-                    dt = datetime.strptime(transaction_date, "%Y-%m-%d")
+                    try:
+                        dt = datetime.fromisoformat(transaction_date)
+                    except ValueError:
+                        # Non-padded dates like 2024-1-5
+                        dt = datetime.strptime(transaction_date, "%Y-%m-%d")
                     transaction_date = dt.isoformat()
                     print(f"[FinanceDB] ✅ Converted date to ISO: {transaction_date}")
             except ValueError as e:
                 print(f"[FinanceDB] ⚠️ Invalid date format '{transaction_date}', using now")
                 transaction_date = datetime.now().isoformat()
         
-        try:
-            result = self.kg.query(query, {
-                "tx_id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "amount": transaction["amount"],
-                "category": transaction.get("category", "other"),
-                "description": transaction["description"],
-                "type": transaction.get("type", "expense"),
-                "payment_mode": transaction.get("payment_mode", "unknown"),
-                "date": transaction_date
-            })
-            
-            print(f"[FinanceDB] ✅ Transaction saved:")
-            print(f"  Amount: ₹{transaction['amount']}")
-            print(f"  Description: {transaction['description']}")
-            print(f"  Date: {transaction_date}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"[FinanceDB] ❌ Transaction failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        return {
+            "tx_id": tx_id or secrets.token_hex(16),
+            "user_id": user_id,
+            "amount": transaction["amount"],
+            "category": transaction.get("category", "other"),
+            "description": transaction["description"],
+            "type": transaction.get("type", "expense"),
+            "payment_mode": transaction.get("payment_mode", "unknown"),
+            "date": transaction_date
+        }
+    
+    @staticmethod
+    def _log_saved(transaction: dict, transaction_date: str):
+        print(f"[FinanceDB] ✅ Transaction saved:")
+        print(f"  Amount: ₹{transaction['amount']}")
+        print(f"  Description: {transaction['description']}")
+        print(f"  Date: {transaction_date}")
     
     def set_budget(self, user_id: str, category: str, monthly_limit: float) -> bool:
         """Set or update budget for a category in FINANCE database"""
-        query = """
-        MERGE (u:User {id: $user_id})
-        MERGE (b:Budget {user_id: $user_id, category: $category})
-        ON CREATE SET b.created_at = datetime()
-        SET b.monthly_limit = $monthly_limit,
-            b.currency = 'INR',
-            b.updated_at = datetime()
-        MERGE (u)-[:HAS_BUDGET]->(b)
-        RETURN b
-        """
-        
         try:
-            self.kg.query(query, {
+            run_write(self.kg, _CYPHER_SET_BUDGET, {
                 "user_id": user_id,
                 "category": category.lower(),
                 "monthly_limit": monthly_limit
@@ -147,10 +387,44 @@ class FinanceDB:
             print(f"[FinanceDB] ❌ Budget failed: {e}")
             return False
     
+    def warm_up(self) -> None:
+        """Pull the transaction/budget graph into Neo4j's page cache and plan the writes"""
+        self._prepare_plans()
+        try:
+            result = run_read(self.kg, _CYPHER_WARMUP)
+            row = result[0] if result else {}
+            print(f"[FinanceDB] ✅ Cache warmed ({row.get('transactions', 0)} transactions, {row.get('budgets', 0)} budgets)")
+        except Exception as e:
+            print(f"[FinanceDB] ⚠️ Cache warmup skipped: {e}")
+    
+    def _prepare_plans(self):
+        """
+        EXPLAIN the write queries so their plans are cached before the
+        first real call. Plans are keyed on query text and parameter
+        types, so the dummy parameters mirror real ones.
+        """
+        txn_params = self._transaction_params("__warmup__", {
+            "amount": 0.0, "description": "", "date": datetime.now().isoformat()
+        })
+        plans = (
+            (_CYPHER_ADD_TRANSACTION, txn_params),
+            (_CYPHER_ADD_TRANSACTION_AND_STATUS, txn_params),
+            (_CYPHER_ADD_TRANSACTIONS_BULK, {"rows": [txn_params]}),
+            (_CYPHER_SET_BUDGET, {"user_id": "__warmup__", "category": "other", "monthly_limit": 0.0}),
+        )
+        
+        for query, params in plans:
+            try:
+                self.kg.query("EXPLAIN " + query, params)
+            except Exception as e:
+                print(f"[FinanceDB] ⚠️ Plan warmup failed: {e}")
+                return
+        print(f"[FinanceDB] ✅ Planned {len(plans)} write queries")
+    
     def verify_connection(self) -> bool:
         """Verify connection to finance database"""
         try:
-            result = self.kg.query("RETURN 1 as test")
+            result = self.kg.query(_CYPHER_VERIFY)
             print("[FinanceDB] ✅ Connection verified")
             return True
         except Exception as e:
@@ -158,30 +432,30 @@ class FinanceDB:
             return False
 
 _finance_db_instance = None
+_finance_db_lock = threading.Lock()
 
-def get_finance_db(kg_conn=None):
+def get_finance_db() -> FinanceDB:
     """
     Get or create FinanceDB singleton instance.
     
-    ⚠️ CRITICAL: ALWAYS call without parameters!
+    Always connects with the finance credentials (NEO4J_URI2); there is
+    no way to hand it a different connection.
     
     Usage:
-        ✅ CORRECT: finance_db = get_finance_db()
-        ❌ WRONG:   finance_db = get_finance_db(some_connection)
+        finance_db = get_finance_db()
     
     Returns:
         FinanceDB: Singleton instance connected to NEO4J_URI2 (finance database)
     """
     global _finance_db_instance
     
-    if kg_conn is not None:
-        print("[get_finance_db] 🚨 WARNING: kg_conn parameter ignored!")
-        print("[get_finance_db]    This may indicate a bug. Check your code.")
-        print("[get_finance_db]    Finance DB should ALWAYS use its own connection.")
-
+    # Double-checked under a lock; lru_cache wouldn't stop two threads
+    # building it concurrently, and reset_finance_db needs to clear it
     if _finance_db_instance is None:
-        _finance_db_instance = FinanceDB(None)
-        print("[get_finance_db] ✅ Singleton created")
+        with _finance_db_lock:
+            if _finance_db_instance is None:
+                _finance_db_instance = FinanceDB(None)
+                print("[get_finance_db] ✅ Singleton created")
     
     return _finance_db_instance
 
@@ -193,7 +467,16 @@ def reset_finance_db():
     ⚠️ WARNING: This closes the current connection!
     Use only for testing or if you need to reconnect.
     """
-    global _finance_db_instance
+    global _finance_db_instance, _graph
+    
+    with _graph_lock:
+        if _graph is not None:
+            try:
+                _graph._driver.close()
+            except Exception as e:
+                print(f"[reset_finance_db] ⚠️ Driver close failed: {e}")
+            _graph = None
+    
     _finance_db_instance = None
     FinanceDB._indexes_created = False  
     print("[reset_finance_db] 🔄 Singleton reset")
\ No newline at end of file
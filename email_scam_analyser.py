@@ -3,9 +3,61 @@ Email Scam Analyzer
 Analyzes emails for scam indicators and provides detailed reports
 """
 
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel, PrivateAttr
+from collections import Counter, OrderedDict
 from datetime import datetime
+from operator import attrgetter
+import re
+import threading
+import xxhash
+from scam_detector.scam_detector import LLM_FALLBACK_SCAM_TYPE, ScamAnalysis
+
+
+def _alternation(keywords) -> str:
+    return "|".join(re.escape(kw) for kw in keywords)
+
+
+SAFE_DOMAINS = frozenset({
+    'gmail.com', 'google.com', 'apple.com', 'microsoft.com',
+    'amazon.com', 'paypal.com', 'facebook.com', 'twitter.com',
+    'linkedin.com', 'github.com', 'stackoverflow.com'
+})
+
+# Organisation-owned domains whose authenticated mail may skip the
+# detector; free-mail providers (gmail.com etc.) never belong here since
+# anyone can send from them
+TRUSTED_SENDER_DOMAINS = frozenset({
+    'google.com', 'apple.com', 'microsoft.com',
+    'amazon.com', 'paypal.com', 'facebook.com', 'twitter.com',
+    'linkedin.com', 'github.com', 'stackoverflow.com'
+})
+
+FINANCIAL_DOMAINS = frozenset({
+    'sbi.co.in', 'hdfcbank.com', 'icicibank.com', 'axisbank.com',
+    'kotak.com', 'pnbindia.in', 'bankofbaroda.in', 'canarabank.com'
+})
+
+# Sort order for results; unknown levels sort last
+_RISK_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+
+# Links are short, so one compiled pass beats a substring scan per keyword
+_SUSPICIOUS_LINK_RE = re.compile(_alternation([
+    'bit.ly', 'tinyurl', 'goo.gl', 't.co', 
+    'verify', 'update', 'secure', 'account-',
+    'login-', 'signin-', 'confirm-'
+]))
+
+# Email bodies run to kilobytes; `keyword in text` uses CPython's
+# vectorized substring search, which is several times faster there than
+# an re alternation that tries every keyword at every position
+_URGENCY_KEYWORDS = (
+    'urgent', 'immediately', 'expire', 'within 24 hours',
+    'act now', 'limited time', 'expire today', 'last chance',
+    'verify now', 'update immediately', 'suspended'
+)
+
+_BANK_KEYWORDS = ('bank', 'sbi', 'hdfc', 'icici', 'axis', 'kotak')
 
 
 class EmailScamResult(BaseModel):
@@ -18,16 +70,19 @@ class EmailScamResult(BaseModel):
     risk_level: str  
     confidence: float
     scam_type: Optional[str] = None
-    red_flags: List[str] = Field(default_factory=list)
+    red_flags: Tuple[str, ...] = ()
     recommendation: str
     safe_sender: bool = False  
     
     # Email-specific indicators
     sender_domain: str = ""
     has_suspicious_links: bool = False
-    suspicious_links: List[str] = Field(default_factory=list)
+    suspicious_links: Tuple[str, ...] = ()
     spoofed_sender: bool = False
     urgency_detected: bool = False
+    
+    # Sort key (0 = most severe); set by EmailScamAnalyzer, not serialized
+    _risk_rank: int = PrivateAttr(default=4)
 
 
 class BulkEmailAnalysisResult(BaseModel):
@@ -38,27 +93,31 @@ class BulkEmailAnalysisResult(BaseModel):
     results: List[EmailScamResult]
     summary: Dict[str, Any]
 
+    def results_iter(self) -> Iterator[Dict[str, Any]]:
+        """Yield each result as a dict, one at a time"""
+        for result in self.results:
+            yield result.model_dump()
+
 
 class EmailScamAnalyzer:
     """Analyzes emails for scam indicators"""
     
+    # Detector verdicts kept per analysis text; overlapping scan windows
+    # see the same emails again
+    VERDICT_CACHE_SIZE = 4096
+    
     def __init__(self):
         """Initialize analyzer"""
         from scam_detector.scam_detector import get_scam_detector
         self.scam_detector = get_scam_detector()
         
 
-        self.safe_domains = {
-            'gmail.com', 'google.com', 'apple.com', 'microsoft.com',
-            'amazon.com', 'paypal.com', 'facebook.com', 'twitter.com',
-            'linkedin.com', 'github.com', 'stackoverflow.com'
-        }
+        self.safe_domains = SAFE_DOMAINS
+        self.trusted_sender_domains = TRUSTED_SENDER_DOMAINS
+        self.financial_domains = FINANCIAL_DOMAINS
         
-
-        self.financial_domains = {
-            'sbi.co.in', 'hdfcbank.com', 'icicibank.com', 'axisbank.com',
-            'kotak.com', 'pnbindia.in', 'bankofbaroda.in', 'canarabank.com'
-        }
+        self._verdicts: "OrderedDict[str, Any]" = OrderedDict()
+        self._verdicts_lock = threading.Lock()
     
     def analyze_email(self, email_message) -> EmailScamResult:
         """
@@ -70,57 +129,19 @@ class EmailScamAnalyzer:
         Returns:
             EmailScamResult with analysis
         """
-        # Extract sender domain
-        sender_domain = self._extract_domain(email_message.sender)
-        
-        # Check if sender is known safe
-        safe_sender = sender_domain in self.safe_domains
-        
-        # Build analysis text
         analysis_text = self._build_analysis_text(email_message)
+        key = self._verdict_key(analysis_text)
         
-        # Email-specific checks
-        suspicious_links = self._check_suspicious_links(email_message.links)
-        spoofed = self._check_sender_spoofing(email_message.sender, email_message.body)
-        urgency = self._check_urgency(email_message.subject, email_message.body)
+        scam_analysis = self._cached_verdict(key) or self._trusted_verdict(email_message, analysis_text)
+        if scam_analysis is None:
+            # Use scam detector
+            scam_analysis = self.scam_detector.detect_scam(
+                message=analysis_text,
+                context=self._detector_context(email_message)
+            )
+            self._store_verdict(key, scam_analysis)
         
-        # Use scam detector
-        scam_analysis = self.scam_detector.detect_scam(
-            message=analysis_text,
-            context={
-                "sender": email_message.sender,
-                "subject": email_message.subject,
-                "has_links": email_message.has_links,
-                "link_count": len(email_message.links)
-            }
-        )
-        
-        # Build result
-        result = EmailScamResult(
-            email_id=email_message.id,
-            subject=email_message.subject,
-            sender=email_message.sender,
-            received_date=email_message.received_date.isoformat(),
-            is_scam=scam_analysis.is_scam,
-            risk_level=scam_analysis.risk_level,
-            confidence=scam_analysis.confidence,
-            scam_type=scam_analysis.scam_type,
-            red_flags=scam_analysis.red_flags,
-            recommendation=scam_analysis.recommendation,
-            safe_sender=safe_sender,
-            sender_domain=sender_domain,
-            has_suspicious_links=len(suspicious_links) > 0,
-            suspicious_links=suspicious_links,
-            spoofed_sender=spoofed,
-            urgency_detected=urgency
-        )
-        
-        # Adjust confidence if known safe sender
-        if safe_sender and not result.is_scam:
-            result.confidence = max(result.confidence, 0.9)
-            result.risk_level = "LOW"
-        
-        return result
+        return self._build_result(email_message, scam_analysis)
     
     def analyze_bulk(
         self,
@@ -137,24 +158,82 @@ class EmailScamAnalyzer:
         Returns:
             BulkEmailAnalysisResult with summary
         """
-        results = []
-        scams_detected = 0
+        scam_analyses = self.detect_verdicts(email_messages)
+        return self.summarize(email_messages, scam_analyses, hours_ago)
+    
+    def detect_verdicts(self, email_messages: List) -> List:
+        """
+        Get the detector verdict for each email, in input order
+        
+        Cached verdicts are reused and clean mail from safe senders skips
+        the detector; the rest go to the detector in one batch.
         
-        for email in email_messages:
-            result = self.analyze_email(email)
-            results.append(result)
+        Args:
+            email_messages: List of EmailMessage objects
             
-            if result.is_scam:
-                scams_detected += 1
+        Returns:
+            List of ScamAnalysis, one per email
+        """
+        texts = [self._build_analysis_text(email) for email in email_messages]
+        keys = [self._verdict_key(text) for text in texts]
+        scam_analyses = [
+            self._cached_verdict(key) or self._trusted_verdict(email, text)
+            for email, text, key in zip(email_messages, texts, keys)
+        ]
+        
+        # One detector call for every email not seen before
+        misses = [i for i, analysis in enumerate(scam_analyses) if analysis is None]
+        if misses:
+            # Identical emails (newsletters, repeated alerts) share a key;
+            # send each distinct text to the detector only once
+            first_by_key = {}
+            for i in misses:
+                first_by_key.setdefault(keys[i], i)
+            unique = list(first_by_key.values())
+            
+            fresh = self.scam_detector.detect_scam_batch(
+                [texts[i] for i in unique],
+                [self._detector_context(email_messages[i]) for i in unique]
+            )
+            by_key = {}
+            for i, analysis in zip(unique, fresh):
+                by_key[keys[i]] = analysis
+                self._store_verdict(keys[i], analysis)
+            for i in misses:
+                scam_analyses[i] = by_key[keys[i]]
+        print(f"[EmailAnalyzer] {len(email_messages) - len(misses)}/{len(email_messages)} verdicts from cache or safe senders")
+        return scam_analyses
+    
+    def summarize(
+        self,
+        email_messages: List,
+        scam_analyses: List,
+        hours_ago: int = 24
+    ) -> BulkEmailAnalysisResult:
+        """
+        Build the bulk result from emails and their detector verdicts
+        
+        Args:
+            email_messages: List of EmailMessage objects
+            scam_analyses: Verdicts from detect_verdicts(), same order
+            hours_ago: Time window for analysis
+            
+        Returns:
+            BulkEmailAnalysisResult with summary
+        """
+        results = [
+            self._build_result(email, scam_analysis)
+            for email, scam_analysis in zip(email_messages, scam_analyses)
+        ]
+        scams_detected = sum(1 for result in results if result.is_scam)
         
         # Sort by risk level
-        risk_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-        results.sort(key=lambda x: risk_order.get(x.risk_level, 4))
+        results.sort(key=attrgetter('_risk_rank'))
         
         # Generate summary
         summary = self._generate_summary(results, hours_ago)
         
-        return BulkEmailAnalysisResult(
+        return BulkEmailAnalysisResult.model_construct(
             total_analyzed=len(results),
             scams_detected=scams_detected,
             safe_emails=len(results) - scams_detected,
@@ -162,6 +241,150 @@ class EmailScamAnalyzer:
             summary=summary
         )
     
+    def needs_full_body(self, email_message) -> bool:
+        """
+        Cheap triage on a metadata-only email (subject, sender, snippet)
+        
+        Returns:
+            True if anything looks off and the full body should be fetched
+        """
+        text_lower = f"{email_message.subject} {email_message.body}".lower()
+        return (
+            any(keyword in text_lower for keyword in _URGENCY_KEYWORDS)
+            or any(keyword in text_lower for keyword in _BANK_KEYWORDS)
+            or bool(self._check_suspicious_links(email_message.links))
+            or bool(self.scam_detector.detect_red_flags(text_lower))
+        )
+    
+    def _trusted_verdict(self, email_message, analysis_text: str) -> Optional[ScamAnalysis]:
+        """
+        LOW-risk verdict for an authenticated trusted sender with no warning signs
+        
+        Returns:
+            ScamAnalysis, or None if the email needs the detector
+        """
+        # The From: header alone is trivially spoofed; Gmail must also
+        # have verified DKIM or SPF for the same domain
+        domain = self._extract_domain(email_message.sender)
+        if domain not in self.trusted_sender_domains:
+            return None
+        if not self._sender_authenticated(email_message.authentication_results, domain):
+            return None
+        
+        body_lower = email_message.body.lower()
+        if (
+            self._check_suspicious_links(email_message.links)
+            or self._check_sender_spoofing(email_message.sender.lower(), body_lower)
+            or self._check_urgency(email_message.subject.lower(), body_lower)
+            or self.scam_detector.detect_red_flags(analysis_text)
+        ):
+            return None
+        
+        return ScamAnalysis.model_construct(
+            is_scam=False,
+            risk_level="LOW",
+            confidence=0.95,
+            scam_type=None,
+            red_flags=[],
+            recommendation="Known safe sender and no warning signs found."
+        )
+    
+    @staticmethod
+    def _sender_authenticated(authentication_results: str, domain: str) -> bool:
+        """
+        Check Gmail's Authentication-Results for a DKIM or SPF pass aligned
+        with the sender's domain
+        
+        Only the header added by Gmail (authserv-id mx.google.com) counts;
+        EmailService keeps the first one, which is Gmail's.
+        """
+        results = authentication_results.lower()
+        if not results.startswith("mx.google.com"):
+            return False
+        domain = re.escape(domain)
+        return bool(re.search(
+            rf"\bdkim=pass\b[^;]*\bheader\.(?:i=[^;\s]*@|d=){domain}(?![\w.-])"
+            rf"|\bspf=pass\b[^;]*\bsmtp\.mailfrom=[^;\s]*@{domain}(?![\w.-])",
+            results
+        ))
+    
+    @staticmethod
+    def _verdict_key(analysis_text: str) -> str:
+        # The analysis text already holds sender, subject, body[:1000]
+        # and link count, i.e. everything the detector sees
+        return xxhash.xxh64_hexdigest(analysis_text.encode())
+    
+    def _cached_verdict(self, key: str):
+        with self._verdicts_lock:
+            analysis = self._verdicts.get(key)
+            if analysis is not None:
+                self._verdicts.move_to_end(key)
+            return analysis
+    
+    def _store_verdict(self, key: str, analysis) -> None:
+        # Don't pin a rule-based fallback; retry the LLM next time
+        if analysis.scam_type == LLM_FALLBACK_SCAM_TYPE:
+            return
+        with self._verdicts_lock:
+            self._verdicts[key] = analysis
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.VERDICT_CACHE_SIZE:
+                self._verdicts.popitem(last=False)
+    
+    @staticmethod
+    def _detector_context(email_message) -> Dict[str, Any]:
+        """Context passed to the scam detector alongside the analysis text"""
+        return {
+            "sender": email_message.sender,
+            "subject": email_message.subject,
+            "has_links": email_message.has_links,
+            "link_count": len(email_message.links)
+        }
+    
+    def _build_result(self, email_message, scam_analysis) -> EmailScamResult:
+        """Combine the detector verdict with the email-specific checks"""
+        # Extract sender domain
+        sender_domain = self._extract_domain(email_message.sender)
+        
+        # Check if sender is known safe
+        safe_sender = sender_domain in self.safe_domains
+        
+        # Email-specific checks; lowercase each field once and share it
+        subject_lower = email_message.subject.lower()
+        body_lower = email_message.body.lower()
+        suspicious_links = self._check_suspicious_links(email_message.links)
+        spoofed = self._check_sender_spoofing(email_message.sender.lower(), body_lower)
+        urgency = self._check_urgency(subject_lower, body_lower)
+        
+        # Build result; every field comes from a validated ScamAnalysis or
+        # our own checks, so skip re-validation
+        result = EmailScamResult.model_construct(
+            email_id=email_message.id,
+            subject=email_message.subject,
+            sender=email_message.sender,
+            received_date=email_message.received_date.isoformat(),
+            is_scam=scam_analysis.is_scam,
+            risk_level=scam_analysis.risk_level,
+            confidence=scam_analysis.confidence,
+            scam_type=scam_analysis.scam_type,
+            red_flags=tuple(scam_analysis.red_flags),
+            recommendation=scam_analysis.recommendation,
+            safe_sender=safe_sender,
+            sender_domain=sender_domain,
+            has_suspicious_links=len(suspicious_links) > 0,
+            suspicious_links=tuple(suspicious_links),
+            spoofed_sender=spoofed,
+            urgency_detected=urgency
+        )
+        
+        # Adjust confidence if known safe sender
+        if safe_sender and not result.is_scam:
+            result.confidence = max(result.confidence, 0.9)
+            result.risk_level = "LOW"
+        
+        result._risk_rank = _RISK_RANK.get(result.risk_level, 4)
+        return result
+    
     def _build_analysis_text(self, email) -> str:
         """Build text for scam analysis"""
         text = f"Subject: {email.subject}\n"
@@ -187,65 +410,48 @@ class EmailScamAnalyzer:
     
     def _check_suspicious_links(self, links: List[str]) -> List[str]:
         """Check for suspicious links"""
-        suspicious = []
-        
-        suspicious_patterns = [
-            'bit.ly', 'tinyurl', 'goo.gl', 't.co', 
-            'verify', 'update', 'secure', 'account-',
-            'login-', 'signin-', 'confirm-'
-        ]
-        
-        for link in links:
-            link_lower = link.lower()
-            if any(pattern in link_lower for pattern in suspicious_patterns):
-                suspicious.append(link)
+        suspicious = [link for link in links if _SUSPICIOUS_LINK_RE.search(link.lower())]
         
         return suspicious[:5] 
     
-    def _check_sender_spoofing(self, sender: str, body: str) -> bool:
-        """Check if sender might be spoofed"""
-        sender_lower = sender.lower()
-        body_lower = body.lower()
-        
-        bank_keywords = ['bank', 'sbi', 'hdfc', 'icici', 'axis', 'kotak']
-        
-        for keyword in bank_keywords:
-            if keyword in body_lower and keyword not in sender_lower:
-                return True
-        
-        return False
+    def _check_sender_spoofing(self, sender_lower: str, body_lower: str) -> bool:
+        """Check if sender might be spoofed (inputs already lowercased)"""
+        # Bank names mentioned in the body that the sender doesn't carry
+        return any(
+            keyword in body_lower and keyword not in sender_lower
+            for keyword in _BANK_KEYWORDS
+        )
     
-    def _check_urgency(self, subject: str, body: str) -> bool:
-        """Check for urgency tactics"""
-        text = (subject + " " + body).lower()
-        
-        urgency_keywords = [
-            'urgent', 'immediately', 'expire', 'within 24 hours',
-            'act now', 'limited time', 'expire today', 'last chance',
-            'verify now', 'update immediately', 'suspended'
-        ]
-        
-        return any(keyword in text for keyword in urgency_keywords)
+    def _check_urgency(self, subject_lower: str, body_lower: str) -> bool:
+        """Check for urgency tactics (inputs already lowercased)"""
+        return any(
+            keyword in subject_lower or keyword in body_lower
+            for keyword in _URGENCY_KEYWORDS
+        )
     
     def _generate_summary(self, results: List[EmailScamResult], hours_ago: int) -> Dict[str, Any]:
         """Generate analysis summary"""
 
-        risk_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
-        for result in results:
-            risk_counts[result.risk_level] = risk_counts.get(result.risk_level, 0) + 1
-
-        scam_types = {}
+        risk_counts = Counter({"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0})
+        scam_types = Counter()
+        with_links = spoofed = urgent = 0
+        
+        # Single pass over the results
         for result in results:
+            risk_counts[result.risk_level] += 1
             if result.scam_type:
-                scam_types[result.scam_type] = scam_types.get(result.scam_type, 0) + 1
+                scam_types[result.scam_type] += 1
+            with_links += result.has_suspicious_links
+            spoofed += result.spoofed_sender
+            urgent += result.urgency_detected
         
         return {
             "time_window_hours": hours_ago,
-            "risk_breakdown": risk_counts,
-            "top_scam_types": dict(sorted(scam_types.items(), key=lambda x: x[1], reverse=True)[:5]),
-            "emails_with_links": sum(1 for r in results if r.has_suspicious_links),
-            "spoofed_senders": sum(1 for r in results if r.spoofed_sender),
-            "urgent_emails": sum(1 for r in results if r.urgency_detected)
+            "risk_breakdown": dict(risk_counts),
+            "top_scam_types": dict(scam_types.most_common(5)),
+            "emails_with_links": with_links,
+            "spoofed_senders": spoofed,
+            "urgent_emails": urgent
         }
 
 
@@ -3,7 +3,33 @@ Email Scam Handler
 Handles email-based scam detection requests
 """
 
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Optional, Tuple
+import asyncio
+
+
+# Emoji for the risk levels listed under "Suspicious Emails Detected"
+_RISK_EMOJI = {"CRITICAL": "🚨", "HIGH": "⛔", "MEDIUM": "⚠️"}
+
+_RISK_BREAKDOWN_LABELS = (
+    ("CRITICAL", "🚨 Critical"),
+    ("HIGH", "⛔ High"),
+    ("MEDIUM", "⚠️ Medium"),
+    ("LOW", "✅ Low"),
+)
+
+_SCAM_RECOMMENDATIONS = (
+    "• Delete suspicious emails immediately\n"
+    "• Do NOT click any links in flagged emails\n"
+    "• Report phishing emails to your email provider\n"
+    "• Enable spam filtering and two-factor authentication\n"
+)
+
+_SAFE_RECOMMENDATIONS = (
+    "• Your recent emails appear safe\n"
+    "• Continue to be cautious with unexpected emails\n"
+    "• Never share OTP, passwords, or financial info via email\n"
+)
 
 
 def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int = 10) -> Dict[str, Any]:
@@ -18,6 +44,39 @@ def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int =
     Returns:
         Dictionary with analysis results
     """
+    response, analysis = _run_email_scan(user_id, hours_ago, max_emails)
+    if analysis is not None:
+        response["results"] = list(analysis.results_iter())
+    return response
+
+
+async def ahandle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int = 10) -> Dict[str, Any]:
+    """Same as handle_email_scam_check, run in a worker thread so Gmail and LLM calls don't block the event loop"""
+    return await asyncio.to_thread(handle_email_scam_check, user_id, hours_ago, max_emails)
+
+
+def iter_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int = 10) -> Iterator[Dict[str, Any]]:
+    """
+    Same as handle_email_scam_check, but yields the response without its
+    results first, then one dict per result, so callers can stream them
+    instead of holding every result dict at once
+    
+    Args:
+        user_id: User identifier
+        hours_ago: Fetch emails from last N hours
+        max_emails: Maximum emails to analyze
+        
+    Yields:
+        Response header dict, then each result dict
+    """
+    response, analysis = _run_email_scan(user_id, hours_ago, max_emails)
+    yield response
+    if analysis is not None:
+        yield from analysis.results_iter()
+
+
+def _run_email_scan(user_id: str, hours_ago: int, max_emails: int) -> Tuple[Dict[str, Any], Optional[Any]]:
+    """Fetch and analyze emails; returns (response without results, analysis or None)"""
     try:
         from email_service import get_email_service
         from email_scam_analyser import get_email_analyzer
@@ -31,13 +90,14 @@ def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int =
                 "error": "authentication_failed",
                 "message": "Failed to authenticate with Gmail. Please check your credentials.",
                 "help": "Make sure credentials.json is in the root directory and has correct permissions."
-            }
+            }, None
         
         # Fetch recent emails
         print(f"[EmailScamHandler] Fetching last {max_emails} emails from past {hours_ago} hours")
         emails = email_service.fetch_recent_emails(
             max_results=max_emails,
-            hours_ago=hours_ago
+            hours_ago=hours_ago,
+            metadata_only=True
         )
         
         if not emails:
@@ -47,20 +107,41 @@ def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int =
                 "scams_detected": 0,
                 "message": f"No emails found in the last {hours_ago} hours.",
                 "results": []
-            }
+            }, None
+        
+        # Only download full bodies for emails that look suspicious from
+        # their headers and snippet
+        flagged = [i for i, email in enumerate(emails) if analyzer.needs_full_body(email)]
+        print(f"[EmailScamHandler] Analyzing {len(emails)} emails, {len(flagged)} fetched in full")
+        
+        if not flagged:
+            scam_analyses = analyzer.detect_verdicts(emails)
+        else:
+            flagged_set = set(flagged)
+            clean = [i for i in range(len(emails)) if i not in flagged_set]
+            scam_analyses = [None] * len(emails)
+            
+            # Classify the clean emails while the flagged bodies download
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                full_future = pool.submit(email_service.fetch_full_emails, [emails[i].id for i in flagged])
+                for i, analysis in zip(clean, analyzer.detect_verdicts([emails[i] for i in clean])):
+                    scam_analyses[i] = analysis
+                full = {email.id: email for email in full_future.result()}
+            
+            for i in flagged:
+                emails[i] = full.get(emails[i].id, emails[i])
+            for i, analysis in zip(flagged, analyzer.detect_verdicts([emails[i] for i in flagged])):
+                scam_analyses[i] = analysis
         
-        # Analyze emails
-        print(f"[EmailScamHandler] Analyzing {len(emails)} emails")
-        analysis = analyzer.analyze_bulk(emails, hours_ago)
+        analysis = analyzer.summarize(emails, scam_analyses, hours_ago)
         
         return {
             "success": True,
             "total_analyzed": analysis.total_analyzed,
             "scams_detected": analysis.scams_detected,
             "safe_emails": analysis.safe_emails,
-            "summary": analysis.summary,
-            "results": [result.model_dump() for result in analysis.results]
-        }
+            "summary": analysis.summary
+        }, analysis
         
     except ImportError as e:
         return {
@@ -68,7 +149,7 @@ def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int =
             "error": "dependencies_missing",
             "message": str(e),
             "help": "Install required packages: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client"
-        }
+        }, None
     except Exception as e:
         print(f"[EmailScamHandler] ❌ Error: {e}")
         import traceback
@@ -78,7 +159,7 @@ def handle_email_scam_check(user_id: str, hours_ago: int = 24, max_emails: int =
             "success": False,
             "error": "analysis_failed",
             "message": f"Email analysis failed: {str(e)}"
-        }
+        }, None
 
 
 def format_email_scam_response(analysis_result: Dict[str, Any]) -> str:
@@ -95,12 +176,11 @@ def format_email_scam_response(analysis_result: Dict[str, Any]) -> str:
         error_msg = analysis_result.get("message", "Unknown error")
         help_msg = analysis_result.get("help", "")
         
-        response = f"❌ **Email Analysis Failed**\n\n"
-        response += f"{error_msg}\n"
+        parts = ["❌ **Email Analysis Failed**\n\n", f"{error_msg}\n"]
         if help_msg:
-            response += f"\n💡 {help_msg}\n"
+            parts.append(f"\n💡 {help_msg}\n")
         
-        return response
+        return "".join(parts)
     
     total = analysis_result.get("total_analyzed", 0)
     scams = analysis_result.get("scams_detected", 0)
@@ -112,70 +192,52 @@ def format_email_scam_response(analysis_result: Dict[str, Any]) -> str:
         return analysis_result.get("message", "No emails to analyze")
     
     # Header
-    response = f"📧 **Email Scam Analysis Report**\n\n"
-    response += f"**Summary:**\n"
-    response += f"• Total Emails Analyzed: {total}\n"
-    response += f"• 🚨 Scams Detected: {scams}\n"
-    response += f"• ✅ Safe Emails: {safe}\n\n"
+    parts = [
+        "📧 **Email Scam Analysis Report**\n\n",
+        "**Summary:**\n",
+        f"• Total Emails Analyzed: {total}\n",
+        f"• 🚨 Scams Detected: {scams}\n",
+        f"• ✅ Safe Emails: {safe}\n\n",
+    ]
+    parts_append = parts.append
     
-
     if summary.get("risk_breakdown"):
-        response += "**Risk Breakdown:**\n"
+        parts_append("**Risk Breakdown:**\n")
         risk_breakdown = summary["risk_breakdown"]
-        if risk_breakdown.get("CRITICAL", 0) > 0:
-            response += f"🚨 Critical: {risk_breakdown['CRITICAL']}\n"
-        if risk_breakdown.get("HIGH", 0) > 0:
-            response += f"⛔ High: {risk_breakdown['HIGH']}\n"
-        if risk_breakdown.get("MEDIUM", 0) > 0:
-            response += f"⚠️ Medium: {risk_breakdown['MEDIUM']}\n"
-        if risk_breakdown.get("LOW", 0) > 0:
-            response += f"✅ Low: {risk_breakdown['LOW']}\n"
-        response += "\n"
+        for level, label in _RISK_BREAKDOWN_LABELS:
+            if risk_breakdown.get(level, 0) > 0:
+                parts_append(f"{label}: {risk_breakdown[level]}\n")
+        parts_append("\n")
     
-
     if scams > 0:
-        response += "**⚠️ Suspicious Emails Detected:**\n\n"
+        parts_append("**⚠️ Suspicious Emails Detected:**\n\n")
         
         count = 0
         for result in results:
-   
-            if result["risk_level"] in ["CRITICAL", "HIGH", "MEDIUM"]:
-                count += 1
-                if count > 5:  
-                    break
- 
-                if result["risk_level"] == "CRITICAL":
-                    emoji = "🚨"
-                elif result["risk_level"] == "HIGH":
-                    emoji = "⛔"
-                else:
-                    emoji = "⚠️"
-                
-                response += f"{emoji} **{result['subject'][:50]}**\n"
-                response += f"   From: {result['sender'][:40]}\n"
-                response += f"   Risk: {result['risk_level']} ({result['confidence']*100:.0f}% confidence)\n"
-                
-                if result.get("scam_type"):
-                    response += f"   Type: {result['scam_type']}\n"
-                
-  
-                if result.get("red_flags") and len(result["red_flags"]) > 0:
-                    response += f"   Red Flags: {result['red_flags'][0]}\n"
-                
-                response += "\n"
+            emoji = _RISK_EMOJI.get(result["risk_level"])
+            if emoji is None:
+                continue
+            
+            count += 1
+            if count > 5:
+                break
+            
+            parts_append(f"{emoji} **{result['subject'][:50]}**\n")
+            parts_append(f"   From: {result['sender'][:40]}\n")
+            parts_append(f"   Risk: {result['risk_level']} ({result['confidence']*100:.0f}% confidence)\n")
+            
+            if result.get("scam_type"):
+                parts_append(f"   Type: {result['scam_type']}\n")
+            
+            if result.get("red_flags"):
+                parts_append(f"   Red Flags: {result['red_flags'][0]}\n")
+            
+            parts_append("\n")
     
-    response += "**🛡️ Recommendations:**\n"
-    if scams > 0:
-        response += "• Delete suspicious emails immediately\n"
-        response += "• Do NOT click any links in flagged emails\n"
-        response += "• Report phishing emails to your email provider\n"
-        response += "• Enable spam filtering and two-factor authentication\n"
-    else:
-        response += "• Your recent emails appear safe\n"
-        response += "• Continue to be cautious with unexpected emails\n"
-        response += "• Never share OTP, passwords, or financial info via email\n"
+    parts_append("**🛡️ Recommendations:**\n")
+    parts_append(_SCAM_RECOMMENDATIONS if scams > 0 else _SAFE_RECOMMENDATIONS)
     
-    return response
+    return "".join(parts)
 
 
 def handle_single_email_analysis(email_text: str, sender: str = None, subject: str = None) -> Dict[str, Any]:
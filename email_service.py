@@ -5,10 +5,13 @@ Fetches recent emails and analyzes them for scams
 
 import os
 import base64
+import html
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
+from html.parser import HTMLParser
 import re
+import threading
 
 try:
     from google.auth.transport.requests import Request
@@ -24,6 +27,49 @@ except ImportError:
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Refresh the access token this long before it expires, so a scan
+# never starts with a token that lapses mid-request
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Gmail accepts up to 100 calls per batch but rate-limits above ~50
+GMAIL_BATCH_SIZE = 50
+
+# Headers requested for format='metadata' fetches; Authentication-Results
+# lets the analyzer check DKIM/SPF before trusting a sender
+METADATA_HEADERS = ['Subject', 'From', 'Date', 'Authentication-Results']
+
+_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+
+def _iter_parts(part: Dict):
+    """Yield a MIME part and all of its nested parts, depth first"""
+    yield part
+    for sub_part in part.get('parts', ()):
+        yield from _iter_parts(sub_part)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document"""
+    
+    _SKIP_TAGS = frozenset({'script', 'style', 'head', 'title'})
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self._skip_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skip_depth += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+    
+    def handle_data(self, data):
+        if not self._skip_depth and not data.isspace():
+            self.chunks.append(data.strip())
+
 
 class EmailMessage:
     """Represents an email message"""
@@ -36,7 +82,8 @@ class EmailMessage:
         received_date: datetime,
         snippet: str = "",
         has_links: bool = False,
-        links: List[str] = None
+        links: List[str] = None,
+        authentication_results: str = ""
     ):
         self.id = id
         self.subject = subject
@@ -46,6 +93,7 @@ class EmailMessage:
         self.snippet = snippet
         self.has_links = has_links
         self.links = links or []
+        self.authentication_results = authentication_results
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -79,14 +127,60 @@ class EmailService:
         self.token_path = token_path or os.getenv("GMAIL_TOKEN_PATH", "token.json")
         self.service = None
         self.user_email = None
+        self._creds = None
+        self._auth_lock = threading.Lock()
     
     def authenticate(self) -> bool:
         """
         Authenticate with Gmail API using OAuth 2.0
         
+        The Gmail service is built once and reused; later calls only
+        refresh the access token when it is close to expiring.
+        
         Returns:
             True if authentication successful
         """
+        with self._auth_lock:
+            if self.service is not None and self._creds is not None:
+                if not self._needs_refresh(self._creds):
+                    return True
+                if self._refresh(self._creds):
+                    return True
+                self.service = None
+            
+            return self._authenticate()
+    
+    @staticmethod
+    def _needs_refresh(creds) -> bool:
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as naive UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < TOKEN_REFRESH_MARGIN
+    
+    def _refresh(self, creds) -> bool:
+        """Refresh creds in place and persist them; False if that isn't possible"""
+        if not creds.refresh_token:
+            return False
+        try:
+            creds.refresh(Request())
+        except Exception as e:
+            print(f"[EmailService] ⚠️ Token refresh failed: {e}")
+            return False
+        self._save_token(creds)
+        return True
+    
+    def _save_token(self, creds) -> None:
+        try:
+            with open(self.token_path, 'w') as token:
+                token.write(creds.to_json())
+        except Exception as e:
+            print(f"[EmailService] ⚠️ Failed to save token: {e}")
+    
+    def _authenticate(self) -> bool:
+        """Full authentication: load or obtain credentials and build the service"""
         creds = None
         
 
@@ -118,18 +212,17 @@ class EmailService:
                     print(f"[EmailService] ❌ OAuth flow failed: {e}")
                     return False
             
-            try:
-                with open(self.token_path, 'w') as token:
-                    token.write(creds.to_json())
-            except Exception as e:
-                print(f"[EmailService] ⚠️ Failed to save token: {e}")
+            self._save_token(creds)
         
         try:
-            self.service = build('gmail', 'v1', credentials=creds)
+            # Discovery doc ships with the client library; skip the file cache
+            service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
             
             # Get user email
-            profile = self.service.users().getProfile(userId='me').execute()
+            profile = service.users().getProfile(userId='me').execute()
             self.user_email = profile.get('emailAddress')
+            self.service = service
+            self._creds = creds
             
             print(f"[EmailService] ✅ Authenticated as {self.user_email}")
             return True
@@ -142,7 +235,8 @@ class EmailService:
         self,
         max_results: int = 10,
         hours_ago: int = 24,
-        query: str = None
+        query: str = None,
+        metadata_only: bool = False
     ) -> List[EmailMessage]:
         """
         Fetch recent emails
@@ -151,6 +245,8 @@ class EmailService:
             max_results: Maximum number of emails to fetch
             hours_ago: Fetch emails from last N hours
             query: Additional Gmail search query
+            metadata_only: Fetch only Subject/From/Date and the snippet; the
+                snippet stands in for the body (see fetch_full_emails)
             
         Returns:
             List of EmailMessage objects
@@ -181,15 +277,11 @@ class EmailService:
                 print("[EmailService] No recent emails found")
                 return []
             
-            # Fetch full messages
-            email_objects = []
-            for msg in messages:
-                try:
-                    email_obj = self._parse_message(msg['id'])
-                    if email_obj:
-                        email_objects.append(email_obj)
-                except Exception as e:
-                    print(f"[EmailService] ⚠️ Failed to parse message {msg['id']}: {e}")
+            # Fetch full messages, many per HTTP round-trip
+            email_objects = self._fetch_messages(
+                [msg['id'] for msg in messages],
+                'metadata' if metadata_only else 'full'
+            )
             
             print(f"[EmailService] ✅ Fetched {len(email_objects)} emails")
             return email_objects
@@ -198,28 +290,93 @@ class EmailService:
             print(f"[EmailService] ❌ Fetch error: {e}")
             return []
     
-    def _parse_message(self, msg_id: str) -> Optional[EmailMessage]:
-        """Parse a single email message"""
+    def fetch_full_emails(self, msg_ids: List[str]) -> List[EmailMessage]:
+        """
+        Fetch complete messages (body included) for the given ids
+        
+        Use after a metadata_only fetch for the emails that need a closer look.
+        """
+        if not msg_ids:
+            return []
+        if not self.service:
+            if not self.authenticate():
+                return []
+        
         try:
-            message = self.service.users().messages().get(
+            return self._fetch_messages(msg_ids, 'full')
+        except HttpError as e:
+            print(f"[EmailService] ❌ Fetch error: {e}")
+            return []
+    
+    def _get_message_request(self, msg_id: str, format: str = 'full'):
+        if format == 'metadata':
+            return self.service.users().messages().get(
                 userId='me',
                 id=msg_id,
-                format='full'
-            ).execute()
-            
-            headers = message['payload'].get('headers', [])
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            )
+        return self.service.users().messages().get(
+            userId='me',
+            id=msg_id,
+            format=format
+        )
+    
+    def _fetch_messages(self, msg_ids: List[str], format: str = 'full') -> List[EmailMessage]:
+        """
+        Fetch and parse messages using Gmail batch requests
+        
+        Returns:
+            Parsed messages in msg_ids order; failed ones are skipped
+        """
+        email_objects = []
+        
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                print(f"[EmailService] ⚠️ Failed to parse message {request_id}: {exception}")
+                return
+            email_obj = self._build_email(request_id, response, with_body=(format == 'full'))
+            if email_obj:
+                email_objects.append(email_obj)
+        
+        for start in range(0, len(msg_ids), GMAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=_collect)
+            for msg_id in msg_ids[start:start + GMAIL_BATCH_SIZE]:
+                batch.add(self._get_message_request(msg_id, format), request_id=msg_id)
+            batch.execute()
+        
+        return email_objects
+    
+    def _parse_message(self, msg_id: str) -> Optional[EmailMessage]:
+        """Fetch and parse a single email message"""
+        try:
+            message = self._get_message_request(msg_id).execute()
+        except Exception as e:
+            print(f"[EmailService] ⚠️ Parse error: {e}")
+            return None
+        return self._build_email(msg_id, message)
+    
+    def _build_email(self, msg_id: str, message: Dict, with_body: bool = True) -> Optional[EmailMessage]:
+        """Build an EmailMessage from a Gmail API message resource"""
+        try:
+            # Header names are case-insensitive; reversed so the first
+            # occurrence of a repeated header wins
+            headers = {
+                header['name'].lower(): header['value']
+                for header in reversed(message['payload'].get('headers', []))
+            }
             
             # Extract headers
-            subject = self._get_header(headers, 'Subject') or '(No Subject)'
-            sender = self._get_header(headers, 'From') or 'Unknown'
-            date_str = self._get_header(headers, 'Date') or ''
+            subject = headers.get('subject') or '(No Subject)'
+            sender = headers.get('from') or 'Unknown'
+            date_str = headers.get('date') or ''
             
             # Parse date
             received_date = self._parse_date(date_str)
             
-            # Extract body
-            body = self._get_body(message['payload'])
+            # Extract body; metadata fetches only have the (HTML-escaped) snippet
             snippet = message.get('snippet', '')
+            body = self._get_body(message['payload']) if with_body else html.unescape(snippet)
             
             # Extract links
             links = self._extract_links(body)
@@ -232,20 +389,14 @@ class EmailService:
                 received_date=received_date,
                 snippet=snippet,
                 has_links=len(links) > 0,
-                links=links
+                links=links,
+                authentication_results=headers.get('authentication-results', '')
             )
             
         except Exception as e:
             print(f"[EmailService] ⚠️ Parse error: {e}")
             return None
     
-    def _get_header(self, headers: List[Dict], name: str) -> Optional[str]:
-        """Get header value by name"""
-        for header in headers:
-            if header['name'].lower() == name.lower():
-                return header['value']
-        return None
-    
     def _parse_date(self, date_str: str) -> datetime:
         """Parse email date string"""
         try:
@@ -256,38 +407,45 @@ class EmailService:
             return datetime.now()
     
     def _get_body(self, payload: Dict) -> str:
-        """Extract email body from payload"""
-        body = ""
-        
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body'].get('data', '')
-                    if data:
-                        body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        break
-                elif part['mimeType'] == 'text/html' and not body:
-                    data = part['body'].get('data', '')
-                    if data:
-                        html = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        body = self._strip_html(html)
-        else:
+        """Extract email body from payload, preferring text/plain over text/html"""
+        if 'parts' not in payload:
             data = payload['body'].get('data', '')
-            if data:
-                body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+            return base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore') if data else ""
+        
+        # Only the first matching leaf is decoded; HTML is touched only
+        # when there is no plain-text part anywhere in the tree
+        data = self._first_part_data(payload, 'text/plain')
+        if data:
+            return base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
         
-        return body
+        data = self._first_part_data(payload, 'text/html')
+        if data:
+            return self._strip_html(base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore'))
+        
+        return ""
+    
+    @staticmethod
+    def _first_part_data(payload: Dict, mime_type: str) -> str:
+        """Base64 data of the first non-empty part of mime_type, searching nested multiparts"""
+        for part in _iter_parts(payload):
+            if part.get('mimeType') == mime_type:
+                data = part.get('body', {}).get('data')
+                if data:
+                    return data
+        return ""
     
     def _strip_html(self, html: str) -> str:
-        """Strip HTML tags"""
-        import re
-        clean = re.compile('<.*?>')
-        return re.sub(clean, '', html)
+        """Strip HTML tags, dropping <script>/<style> contents and decoding entities"""
+        if not html:
+            return ''
+        extractor = _TextExtractor()
+        extractor.feed(html)
+        extractor.close()
+        return ' '.join(extractor.chunks)
     
     def _extract_links(self, text: str) -> List[str]:
         """Extract URLs from text"""
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        return re.findall(url_pattern, text)
+        return _URL_RE.findall(text)
 
 _email_service = None
 
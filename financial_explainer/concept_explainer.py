@@ -5,7 +5,7 @@ Explains financial concepts based on user's spending patterns and risk profile
 
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from langchain_core.prompts import ChatPromptTemplate
 from datetime import datetime
 
@@ -36,7 +36,7 @@ class FinancialConceptExplainer:
     """
     
     def __init__(self):
-        self.llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.3)
+        self.llm = groq_chat(model="llama-3.1-8b-instant", temperature=0.3)
         
         # Common financial concepts and their core meanings
         self.concept_database = {
@@ -3,9 +3,9 @@ Language Detection and Multilingual Response Handler
 Detects user's language preference and generates responses accordingly
 """
 
-from typing import Optional, Dict, Literal
+from typing import Optional, Dict, Iterator, Literal
 from pydantic import BaseModel, Field
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from langchain_core.prompts import ChatPromptTemplate
 
 
@@ -30,7 +30,7 @@ class LanguageHandler:
     """Handles language detection and response formatting"""
     
     def __init__(self):
-        self.llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+        self.llm = groq_chat(model="llama-3.1-8b-instant", temperature=0)
         
         # Language indicators
         self.language_patterns = {
@@ -180,52 +180,67 @@ Examples:
         else:
             return self._format_english(explanation, spending_data)
     
+    def iter_vernacular_response(
+        self,
+        explanation: Dict,
+        language_pref: str,
+        spending_data: Dict
+    ) -> Iterator[str]:
+        """
+        Same as format_vernacular_response, but yields the response section by
+        section so callers can stream it (Hinglish translates per section)
+        """
+        if language_pref in ("hinglish", "hindi"):
+            # Hindi (Devanagari) falls back to Hinglish, as in _format_hindi
+            return self._iter_hinglish(explanation, spending_data)
+        return self._iter_english(explanation, spending_data)
+    
     def _format_hinglish(self, exp: Dict, data: Dict) -> str:
         """Format response in natural Hinglish"""
+        return "".join(self._iter_hinglish(exp, data))
+    
+    def _iter_hinglish(self, exp: Dict, data: Dict) -> Iterator[str]:
+        """Yield the Hinglish response section by section, translating as it goes"""
         
         print(f"[Hinglish Formatter] Starting Hinglish formatting...")
         print(f"[Hinglish Formatter] Concept: {exp.get('concept', 'Unknown')}")
         
-        response = f"💡 **{exp['concept']} ko samajhte hain**\n\n"
+        yield f"💡 **{exp['concept']} ko samajhte hain**\n\n"
         
         # Simple explanation in Hinglish
-        response += f"**Yeh kya hai:**\n"
         simple_exp = self._translate_to_hinglish(exp['simple_explanation'])
         print(f"[Hinglish Formatter] Simple explanation translated")
-        response += simple_exp + "\n\n"
+        yield f"**Yeh kya hai:**\n{simple_exp}\n\n"
         
         # Personalized context
-        response += f"**Aapki situation ke liye:**\n"
         context_exp = self._translate_to_hinglish(exp['personalized_context'])
         print(f"[Hinglish Formatter] Context translated")
-        response += context_exp + "\n\n"
+        yield f"**Aapki situation ke liye:**\n{context_exp}\n\n"
         
         # Practical example
         if exp.get('practical_example'):
-            response += f"**Example:**\n"
             example_exp = self._translate_to_hinglish(exp['practical_example'])
             print(f"[Hinglish Formatter] Example translated")
-            response += example_exp + "\n\n"
+            yield f"**Example:**\n{example_exp}\n\n"
         
         # Key points
         if exp.get('key_points'):
-            response += "**Yaad rakhne wali baatein:**\n"
-            for i, point in enumerate(exp['key_points'], 1):
-                translated_point = self._translate_to_hinglish(point)
-                response += f"{i}. {translated_point}\n"
-            response += "\n"
+            points = "".join(
+                f"{i}. {self._translate_to_hinglish(point)}\n"
+                for i, point in enumerate(exp['key_points'], 1)
+            )
             print(f"[Hinglish Formatter] Key points translated")
+            yield f"**Yaad rakhne wali baatein:**\n{points}\n"
         
         # Recommendation
-        response += f"**Meri salah:**\n"
         recommendation = self._translate_to_hinglish(exp['recommendation'])
         print(f"[Hinglish Formatter] Recommendation translated")
-        response += recommendation + "\n"
+        yield f"**Meri salah:**\n{recommendation}\n"
         
         # Risk note
         if exp.get('risk_note'):
             risk_note = self._translate_to_hinglish(exp['risk_note'])
-            response += f"\n⚠️ {risk_note}\n"
+            yield f"\n⚠️ {risk_note}\n"
         
         print(f"[Hinglish Formatter] ✅ Hinglish formatting complete")
         
@@ -235,11 +250,11 @@ Examples:
         if total > 0:
             savings = income - total
             savings_rate = (savings / income * 100) if income > 0 else 0
-            response += f"\n📊 **Aapka current finance:**\n"
-            response += f"• Monthly kharch: ₹{total:,.0f}\n"
-            response += f"• Estimated bachत: ₹{savings:,.0f} ({savings_rate:.1f}%)\n"
-        
-        return response
+            yield (
+                f"\n📊 **Aapka current finance:**\n"
+                f"• Monthly kharch: ₹{total:,.0f}\n"
+                f"• Estimated bachत: ₹{savings:,.0f} ({savings_rate:.1f}%)\n"
+            )
     
     def _translate_to_hinglish(self, text: str) -> str:
         """
@@ -329,35 +344,36 @@ IMPORTANT: Translate the ENTIRE text, not just parts. Make it sound natural and
     
     def _format_english(self, exp: Dict, data: Dict) -> str:
         """Format response in English (existing format)"""
-        
-        response = f"💡 **Understanding {exp['concept']}**\n\n"
-        response += f"**What it means:**\n{exp['simple_explanation']}\n\n"
-        response += f"**For your situation:**\n{exp['personalized_context']}\n\n"
+        return "".join(self._iter_english(exp, data))
+    
+    def _iter_english(self, exp: Dict, data: Dict) -> Iterator[str]:
+        """Yield the English response section by section"""
+        yield f"💡 **Understanding {exp['concept']}**\n\n"
+        yield f"**What it means:**\n{exp['simple_explanation']}\n\n"
+        yield f"**For your situation:**\n{exp['personalized_context']}\n\n"
         
         if exp.get('practical_example'):
-            response += f"**Practical Example:**\n{exp['practical_example']}\n\n"
+            yield f"**Practical Example:**\n{exp['practical_example']}\n\n"
         
         if exp.get('key_points'):
-            response += "**Key Points to Remember:**\n"
-            for i, point in enumerate(exp['key_points'], 1):
-                response += f"{i}. {point}\n"
-            response += "\n"
+            points = "".join(f"{i}. {point}\n" for i, point in enumerate(exp['key_points'], 1))
+            yield f"**Key Points to Remember:**\n{points}\n"
         
-        response += f"**My Suggestion:**\n{exp['recommendation']}\n"
+        yield f"**My Suggestion:**\n{exp['recommendation']}\n"
         
         if exp.get('risk_note'):
-            response += f"\n⚠️ {exp['risk_note']}\n"
+            yield f"\n⚠️ {exp['risk_note']}\n"
         
         total = data.get('total_spent', 0)
         income = data.get('income', 0)
         if total > 0:
             savings = income - total
             savings_rate = (savings / income * 100) if income > 0 else 0
-            response += f"\n📊 **Your Current Finances:**\n"
-            response += f"• Monthly Spending: ₹{total:,.0f}\n"
-            response += f"• Estimated Savings: ₹{savings:,.0f} ({savings_rate:.1f}%)\n"
-        
-        return response
+            yield (
+                f"\n📊 **Your Current Finances:**\n"
+                f"• Monthly Spending: ₹{total:,.0f}\n"
+                f"• Estimated Savings: ₹{savings:,.0f} ({savings_rate:.1f}%)\n"
+            )
 
 
 # Singleton
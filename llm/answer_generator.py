@@ -1,10 +1,10 @@
 from agent.class_agent import AgentState
 from langchain_core.prompts import  ChatPromptTemplate,MessagesPlaceholder
 from langchain_core.messages import HumanMessage,AIMessage,SystemMessage,BaseMessage,ToolMessage
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 
 
-llm=ChatGroq(model="llama-3.1-8b-instant",temperature=0)
+llm=groq_chat(model="llama-3.1-8b-instant",temperature=0)
 def call(state: AgentState):
     prompt_template = ChatPromptTemplate.from_messages([
        (
@@ -1,10 +1,10 @@
 from agent.class_agent import AgentState
 from  pydantic import BaseModel, Field
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from langchain_core.prompts import  ChatPromptTemplate,MessagesPlaceholder
 
 
-grader_llm=ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+grader_llm=groq_chat(model="llama-3.1-8b-instant", temperature=0)
 
 class RelevanceScore(BaseModel):
     """Binary score for context relevance."""
@@ -0,0 +1,34 @@
+"""
+Shared Groq HTTP connection pools
+
+Every ChatGroq otherwise builds its own httpx clients, so each model
+instance (and every per-call instance) opens fresh TCP/TLS connections.
+"""
+
+from langchain_groq import ChatGroq
+import httpx
+
+
+GROQ_POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# Sync client for invoke()/batch() from worker threads; async client for
+# ainvoke() on the server's event loop
+groq_http_client = httpx.Client(limits=GROQ_POOL_LIMITS)
+groq_http_async_client = httpx.AsyncClient(limits=GROQ_POOL_LIMITS)
+
+
+def groq_chat(**kwargs) -> ChatGroq:
+    """
+    Create a ChatGroq that reuses the shared connection pools
+
+    Args:
+        **kwargs: Passed to ChatGroq (model, temperature, ...)
+
+    Returns:
+        ChatGroq instance
+    """
+    return ChatGroq(
+        http_client=groq_http_client,
+        http_async_client=groq_http_async_client,
+        **kwargs
+    )
@@ -1,10 +1,10 @@
 from agent.class_agent import AgentState
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 
 
 # Rewriter function
 
-rewriter_llm=ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+rewriter_llm=groq_chat(model="llama-3.1-8b-instant", temperature=0)
 def rewrite_query(state: AgentState):
     print("---REWRITING QUERY---")
     history = state["messages"]
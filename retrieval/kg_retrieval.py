@@ -1,7 +1,7 @@
 from langchain_neo4j import Neo4jGraph
 from typing import List, Optional
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_neo4j.vectorstores.neo4j_vector import remove_lucene_chars
@@ -69,7 +69,7 @@ class UserProfile(BaseModel):
     category: Optional[str] = None
     occupation: Optional[str] = None
 
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = groq_chat(model="llama-3.1-8b-instant", temperature=0)
 
 profile_prompt = ChatPromptTemplate.from_messages([
     ("system", """
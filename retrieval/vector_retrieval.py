@@ -1,4 +1,4 @@
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
 from agent.class_agent import AgentState
@@ -9,7 +9,7 @@ import os
 load_dotenv()
 
 def get_llm():
-     return ChatGroq(model="llama-3.1-8b-instant",temperature=0)
+     return groq_chat(model="llama-3.1-8b-instant",temperature=0)
 
 embeddings = GoogleGenerativeAIEmbeddings(
     model="models/gemini-embedding-001",
@@ -77,7 +77,7 @@ def update_summary(old_memory:str,update_context:list)->str:
     Returns:
         Updated summary string
     """
-    summary_llm=ChatGroq(
+    summary_llm=groq_chat(
         model="llama-3.1-8b-instant",
         temperature=0.3
     )
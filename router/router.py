@@ -1,7 +1,7 @@
 from agent.class_agent import AgentState
 from  pydantic import BaseModel, Field
 from typing  import Literal
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 
 
 ### ROUTER CLASS MEMORY ROUTER ###
@@ -19,8 +19,8 @@ class MemoryRoute(BaseModel):
     )
 
 
-tier_1=ChatGroq(model="llama-3.1-8b-instant", temperature=0, max_retries=0)
-backup_model = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+tier_1=groq_chat(model="llama-3.1-8b-instant", temperature=0, max_retries=0)
+backup_model = groq_chat(model="llama-3.1-8b-instant", temperature=0)
 
 router_llm = (
     tier_1
@@ -1,7 +1,8 @@
 import os
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from langchain_core.prompts import ChatPromptTemplate
 
 class ScamAnalysis(BaseModel):
@@ -13,6 +14,13 @@ class ScamAnalysis(BaseModel):
     red_flags: list[str] = Field(default_factory=list, description="List of suspicious indicators")
     recommendation: str = Field(..., description="User recommendation")
 
+# Concurrent LLM requests per detect_scam_batch call (Groq rate limits)
+LLM_BATCH_CONCURRENCY = 8
+
+# scam_type of the rule-based result used when the LLM call fails
+LLM_FALLBACK_SCAM_TYPE = "Unknown (LLM analysis failed)"
+
+
 class ScamDetector:
     """
     Detects scams using multiple approaches:
@@ -22,7 +30,7 @@ class ScamDetector:
     """
     
     def __init__(self):
-        self.llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+        self.llm = groq_chat(model="llama-3.1-8b-instant", temperature=0)
         self.ml_model = self._load_ml_model()
 
         # Common scam indicators
@@ -35,6 +43,14 @@ class ScamDetector:
             'impersonation': ['bank', 'government', 'income tax', 'police', 'courier'],
             'suspicious_links': ['bit.ly', 'tinyurl', 'click here', 'verify account', 'update kyc']
         }
+        
+        # (keyword, flag label) pairs; every detection reuses the same label
+        # string instead of formatting a new one per message
+        self._red_flag_labels = tuple(
+            (keyword, f"{category}: '{keyword}'")
+            for category, keywords in self.red_flag_keywords.items()
+            for keyword in keywords
+        )
     
     def _load_ml_model(self):
         """Load ML model if available"""
@@ -82,7 +98,7 @@ class ScamDetector:
             ScamAnalysis object with detection results
         """
         # Step 1: Rule-based red flag detection
-        red_flags = self._detect_red_flags(message)
+        red_flags = self.detect_red_flags(message)
         
         # Step 2: LLM-based analysis
         llm_analysis = self._llm_analyze(message, red_flags)
@@ -97,21 +113,60 @@ class ScamDetector:
         
         return final_analysis
     
-    def _detect_red_flags(self, message: str) -> list[str]:
-        """Detect red flag keywords in message"""
-        message_lower = message.lower()
-        flags = []
+    def detect_scam_batch(
+        self,
+        messages: List[str],
+        contexts: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> List[ScamAnalysis]:
+        """
+        detect_scam for many messages at once
+        
+        LLM requests run concurrently and the ML model scores every message
+        with context in a single predict_proba call.
+        
+        Args:
+            messages: Messages/texts to analyze
+            contexts: Optional context per message (same order as messages)
+            
+        Returns:
+            One ScamAnalysis per message, in input order
+        """
+        if not messages:
+            return []
+        if contexts is None:
+            contexts = [None] * len(messages)
         
-        for category, keywords in self.red_flag_keywords.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    flags.append(f"{category}: '{keyword}'")
+        red_flags = [self.detect_red_flags(message) for message in messages]
+        llm_analyses = self._llm_analyze_batch(messages, red_flags)
         
-        return flags
+        # Same rule as detect_scam: only messages with context get an ML score
+        ml_scores = [None] * len(messages)
+        with_context = [i for i, context in enumerate(contexts) if context]
+        if self.ml_model and with_context:
+            scores = self._ml_predict_batch(
+                [messages[i] for i in with_context],
+                [contexts[i] for i in with_context]
+            )
+            for i, score in zip(with_context, scores):
+                ml_scores[i] = score
         
-    def _llm_analyze(self, message: str, red_flags: list[str]) -> Dict[str, Any]:
-        """Use LLM to analyze message for scam patterns"""
+        return [
+            self._combine_results(llm_analysis, flags, ml_score)
+            for llm_analysis, flags, ml_score in zip(llm_analyses, red_flags, ml_scores)
+        ]
+    
+    def detect_red_flags(self, message: str) -> list[str]:
+        """
+        Detect red flag keywords in message (keyword scan only, no LLM or ML)
+        
+        Returns:
+            Labels of the red flags found, in _red_flag_labels order
+        """
+        message_lower = message.lower()
+        return [label for keyword, label in self._red_flag_labels if keyword in message_lower]
         
+    def _llm_chain(self):
+        """Build the structured-output scam analysis chain"""
         scam_prompt = ChatPromptTemplate.from_messages([
             ("system", """
 You are a cybersecurity expert specializing in scam detection.
@@ -150,21 +205,54 @@ Analyze this message and determine if it's a scam.
 """)
         ])
         
-        chain = scam_prompt | self.llm.with_structured_output(ScamAnalysis)
+        return scam_prompt | self.llm.with_structured_output(ScamAnalysis)
+    
+    @staticmethod
+    def _llm_input(message: str, red_flags: list[str]) -> Dict[str, str]:
+        return {
+            "message": message,
+            "red_flags": "\n".join(red_flags) if red_flags else "None detected"
+        }
         
+    def _llm_analyze(self, message: str, red_flags: list[str]) -> Dict[str, Any]:
+        """Use LLM to analyze message for scam patterns"""
         try:
-            result = chain.invoke({
-                "message": message,
-                "red_flags": "\n".join(red_flags) if red_flags else "None detected"
-            })
+            result = self._llm_chain().invoke(self._llm_input(message, red_flags))
             return result.model_dump()
         except Exception as e:
             print(f"[ScamDetector] ❌ LLM analysis failed: {e}")
             # Fallback to rule-based
             return self._fallback_analysis(message, red_flags)
     
+    def _llm_analyze_batch(self, messages: List[str], red_flags: List[list[str]]) -> List[Dict[str, Any]]:
+        """_llm_analyze for many messages; requests run concurrently, failures fall back per message"""
+        results = self._llm_chain().batch(
+            [self._llm_input(m, f) for m, f in zip(messages, red_flags)],
+            config={"max_concurrency": LLM_BATCH_CONCURRENCY},
+            return_exceptions=True,
+        )
+        
+        analyses = []
+        for message, flags, result in zip(messages, red_flags, results):
+            if isinstance(result, Exception):
+                print(f"[ScamDetector] ❌ LLM analysis failed: {result}")
+                analyses.append(self._fallback_analysis(message, flags))
+            else:
+                analyses.append(result.model_dump())
+        return analyses
+    
     def _ml_predict(self, message: str, context: Dict[str, Any]) -> float:
         """Use ML model for prediction if available"""
+        return self._ml_predict_batch([message], [context])[0]
+    
+    def _ml_predict_batch(self, messages: List[str], contexts: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """
+        Scam probability for each message, vectorized in one predict_proba call
+        
+        Returns:
+            One probability per message; all None if the model is unusable
+        """
+        failed = [None] * len(messages)
         try:
             from scipy.sparse import hstack
             import numpy as np
@@ -178,29 +266,26 @@ Analyze this message and determine if it's a scam.
             
             if model is None or tfidf_scam is None:
                 print("[ScamDetector] ⚠️ ML model or vectorizer missing")
-                return None
+                return failed
             
 
-            X_scam = tfidf_scam.transform([message])
+            X_scam = tfidf_scam.transform(messages)
             
  
-            response_text = context.get("response_text", "")
             if tfidf_response is not None:
-                X_resp = tfidf_response.transform([response_text])
+                X_resp = tfidf_response.transform([ctx.get("response_text", "") for ctx in contexts])
             else:
                 X_resp = None
             
 
-            numeric_values = []
-            for feature in safe_features:
-                value = context.get(feature, 0)
-                if isinstance(value, (int, float)):
-                    numeric_values.append(value)
-                else:
-                    numeric_values.append(0)
-            
-            # ✅ FIX: Create proper numpy array
-            numeric_array = np.array([numeric_values])
+            # One row of numeric features per message; non-numbers count as 0
+            numeric_array = np.array([
+                [
+                    value if isinstance(value, (int, float)) else 0
+                    for value in (ctx.get(feature, 0) for feature in safe_features)
+                ]
+                for ctx in contexts
+            ]).reshape(len(contexts), len(safe_features))
             
             # Combine features
             if X_resp is not None:
@@ -208,27 +293,23 @@ Analyze this message and determine if it's a scam.
             else:
                 X = hstack([X_scam, numeric_array])
             
-            # ✅ FIX: Predict probability correctly
             try:
-                # Get probability of class 1 (scam)
+                # proba is shape (n_samples, n_classes); column 1 is the scam class
                 proba = model.predict_proba(X)
+                scam_probabilities = [float(p) for p in proba[:, 1]]
                 
-                # proba is shape (n_samples, n_classes)
-                # We want probability of class 1 (scam class)
-                scam_probability = float(proba[0, 1])
-                
-                print(f"[ScamDetector] ✅ ML prediction: {scam_probability:.2%} scam probability")
-                return scam_probability
+                print(f"[ScamDetector] ✅ ML prediction for {len(messages)} message(s)")
+                return scam_probabilities
                 
             except Exception as e:
                 print(f"[ScamDetector] ⚠️ Prediction failed: {e}")
-                return None
+                return failed
             
         except Exception as e:
             print(f"[ScamDetector] ⚠️ ML prediction failed: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            return failed
     
     def _fallback_analysis(self, message: str, red_flags: list[str]) -> Dict[str, Any]:
         """Fallback analysis when LLM fails"""
@@ -255,7 +336,7 @@ Analyze this message and determine if it's a scam.
             "is_scam": is_scam,
             "risk_level": risk_level,
             "confidence": confidence,
-            "scam_type": "Unknown (LLM analysis failed)",
+            "scam_type": LLM_FALLBACK_SCAM_TYPE,
             "red_flags": red_flags,
             "recommendation": "⚠️ Analysis incomplete. Exercise caution and verify with official sources."
         }
@@ -328,11 +409,16 @@ def predict_scam(payload: dict) -> float:
     return result.confidence
 
 _detector = None
+_detector_lock = threading.Lock()
 
 def get_scam_detector() -> ScamDetector:
     """Get or create scam detector singleton"""
     global _detector
+    # Handlers call this from worker threads; build the detector (and load
+    # the ML model) only once
     if _detector is None:
-        _detector = ScamDetector()
-        print("[ScamDetector] ✅ Singleton initialized")
+        with _detector_lock:
+            if _detector is None:
+                _detector = ScamDetector()
+                print("[ScamDetector] ✅ Singleton initialized")
     return _detector
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+FinGuard configuration
+
+Environment variables are read once, on the first get_settings() call,
+and frozen for the life of the process.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+from dotenv import load_dotenv
+import os
+
+
+REQUIRED_VARS = (
+    "GROQ_API_KEY",
+    "GOOGLE_API_KEY",
+    "NEO4J_URI",
+    "NEO4J_USERNAME",
+    "NEO4J_PASSWORD",
+    "NEO4J_URI2",
+    "NEO4J_USERNAME2",
+    "NEO4J_PASSWORD2",
+)
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Neo4j finance database (Database 2)
+    neo4j_uri2: str
+    neo4j_username2: str
+    neo4j_password2: str
+    neo4j_database2: str
+    neo4j_max_pool_size: int
+
+    # App
+    allowed_origins: Tuple[str, ...]
+    enable_scam_detector: bool
+    log_level: str
+
+    # Names from REQUIRED_VARS that were unset or empty
+    missing_vars: Tuple[str, ...]
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the process-wide settings snapshot"""
+    load_dotenv()
+    env = os.environ
+
+    return Settings(
+        neo4j_uri2=env.get("NEO4J_URI2", ""),
+        neo4j_username2=env.get("NEO4J_USERNAME2", ""),
+        neo4j_password2=env.get("NEO4J_PASSWORD2", ""),
+        neo4j_database2=env.get("NEO4J_DATABASE2", "neo4j"),
+        neo4j_max_pool_size=int(env.get("NEO4J_MAX_CONNECTION_POOL_SIZE", "50")),
+        allowed_origins=tuple(o.strip() for o in env.get("ALLOWED_ORIGINS", "*").split(",") if o.strip()),
+        enable_scam_detector=env.get("ENABLE_SCAM_DETECTOR", "1") == "1",
+        log_level=env.get("LOG_LEVEL", "INFO").upper(),
+        missing_vars=tuple(var for var in REQUIRED_VARS if not env.get(var)),
+    )
@@ -1,4 +1,5 @@
-from smart_budget_manager.spending_analyser import SpendingAnalyzer
+from smart_budget_manager.spending_analyser import get_spending_analyzer
+from db_.neo4j_finance import get_finance_db
 
 
 def generate_monthly_report(user_id: str) -> str:
@@ -13,11 +14,9 @@ def generate_monthly_report(user_id: str) -> str:
     Returns:
         Formatted report string
     """
- 
-    from db_.neo4j_finance import get_finance_db
     finance_db = get_finance_db()
     
-    analyzer = SpendingAnalyzer(finance_db.kg)
+    analyzer = get_spending_analyzer(finance_db.kg)
     
     spending = analyzer.get_monthly_spending(user_id)
     budget_status = analyzer.check_budget_status(user_id)
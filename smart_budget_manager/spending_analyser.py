@@ -1,5 +1,140 @@
 from datetime import datetime, timedelta
+import functools
+import logging
 from langchain_neo4j import Neo4jGraph
+from db_.neo4j_finance import run_read
+
+logger = logging.getLogger(__name__)
+
+
+_CYPHER_MONTHLY_SPENDING = """
+MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.type = 'expense'
+  AND t.date IS NOT NULL
+  AND t.date >= datetime($start_date)
+  AND t.date <= datetime($end_date)
+  AND ($category IS NULL OR t.category = $category)
+WITH COALESCE(t.category, 'other') as category, t.amount as amount
+RETURN 
+    category,
+    sum(amount) as total_spent,
+    count(amount) as transaction_count
+ORDER BY total_spent DESC
+"""
+
+
+_CYPHER_BUDGET_STATUS = """
+MATCH (u:User {id: $user_id})-[:HAS_BUDGET]->(b:Budget)
+OPTIONAL MATCH (u)-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.category = b.category 
+  AND t.type = 'expense'
+WITH b, sum(COALESCE(t.amount, 0)) as spent
+RETURN 
+    b.category as category,
+    b.monthly_limit as budget,
+    spent as spent,
+    (spent / b.monthly_limit * 100) as usage_percent
+ORDER BY usage_percent DESC
+"""
+
+
+_CYPHER_DAILY_SPENDING = """
+MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.type = 'expense'
+  AND t.date IS NOT NULL
+  AND t.date >= datetime($start_date)
+  AND t.date <= datetime($end_date)
+RETURN 
+    t.date as date,
+    t.amount as amount,
+    COALESCE(t.category, 'other') as category,
+    t.description as description,
+    t.payment_mode as payment_mode
+ORDER BY t.date DESC
+"""
+
+
+_CYPHER_DAILY_SUMMARY = """
+MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.type = 'expense'
+  AND t.date IS NOT NULL
+  AND t.date >= datetime($start_date)
+  AND t.date <= datetime($end_date)
+WITH COALESCE(t.category, 'other') as category, t.amount as amount
+RETURN 
+    category,
+    sum(amount) as total_spent,
+    count(amount) as transaction_count
+ORDER BY total_spent DESC
+"""
+
+
+_CYPHER_DATE_RANGE_SPENDING = """
+MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.type = 'expense'
+  AND t.date IS NOT NULL
+  AND t.date >= datetime($start_date)
+  AND t.date <= datetime($end_date)
+RETURN 
+    t.date as date,
+    t.amount as amount,
+    COALESCE(t.category, 'other') as category,
+    t.description as description
+ORDER BY t.date DESC
+"""
+
+
+_CYPHER_DATE_RANGE_SUMMARY = """
+MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+WHERE t.type = 'expense'
+  AND t.date IS NOT NULL
+  AND t.date >= datetime($start_date)
+  AND t.date <= datetime($end_date)
+WITH toString(date(t.date)) as d, sum(t.amount) as total, count(t) as cnt
+RETURN 
+    d as date,
+    total,
+    cnt as count
+ORDER BY date DESC
+"""
+
+# Monthly spending + all-time budget status in one round-trip; each CALL
+# aggregates to a single row so the outer RETURN is exactly one record
+_CYPHER_SPENDING_AND_BUDGET = """
+CALL {
+    MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+    WHERE t.type = 'expense'
+      AND t.date IS NOT NULL
+      AND t.date >= datetime($start_date)
+      AND t.date <= datetime($end_date)
+      AND ($category IS NULL OR t.category = $category)
+    WITH COALESCE(t.category, 'other') as category, t.amount as amount
+    WITH category, sum(amount) as total_spent, count(amount) as transaction_count
+    ORDER BY total_spent DESC
+    RETURN collect({
+        category: category,
+        total_spent: total_spent,
+        transaction_count: transaction_count
+    }) as spending, sum(total_spent) as grand_total
+}
+CALL {
+    MATCH (u:User {id: $user_id})-[:HAS_BUDGET]->(b:Budget)
+    OPTIONAL MATCH (u)-[:MADE_TRANSACTION]->(t:Transaction)
+    WHERE t.category = b.category 
+      AND t.type = 'expense'
+    WITH b, sum(COALESCE(t.amount, 0)) as spent
+    WITH b, spent, (spent / b.monthly_limit * 100) as usage_percent
+    ORDER BY usage_percent DESC
+    RETURN collect({
+        category: b.category,
+        budget: b.monthly_limit,
+        spent: spent,
+        usage_percent: usage_percent
+    }) as budget_status
+}
+RETURN spending, grand_total, budget_status
+"""
+
 
 class SpendingAnalyzer:
     def __init__(self, kg_conn: Neo4jGraph):
@@ -13,49 +148,25 @@ class SpendingAnalyzer:
         self.kg = kg_conn
         print(f"[SpendingAnalyzer] ✅ Initialized with connection: {type(kg_conn)}")
     
-    def get_monthly_spending(self, user_id: str, category: str = None) -> list:
+    def get_monthly_spending(self, user_id: str, category: str = None, now: datetime = None) -> list:
         """
         Get current month spending
         
+        Args:
+            user_id: User identifier
+            category: Optional category filter
+            now: Reference time (defaults to now); the month runs from its 1st to this instant
+            
         Returns:
             List of dicts with spending by category
         """
 
-        query = """
-        MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
-        WHERE t.type = 'expense'
-          AND t.date IS NOT NULL
-          AND t.date >= datetime($start_date)
-          AND t.date <= datetime($end_date)
-          AND ($category IS NULL OR t.category = $category)
-        WITH COALESCE(t.category, 'other') as category, t.amount as amount
-        RETURN 
-            category,
-            sum(amount) as total_spent,
-            count(amount) as transaction_count
-        ORDER BY total_spent DESC
-        """
-        
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         start_of_month = datetime(now.year, now.month, 1)
         
         try:
-            debug_query = """
-            MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
-            RETURN count(t) as total_count, 
-                   count(CASE WHEN t.date IS NULL THEN 1 END) as null_dates,
-                   min(t.date) as earliest,
-                   max(t.date) as latest
-            """
-            debug_result = self.kg.query(debug_query, {"user_id": user_id})
-            if debug_result and debug_result[0]:
-                dr = debug_result[0]
-                print(f"[SpendingAnalyzer] 🔍 Total: {dr.get('total_count', 0)} | Null dates: {dr.get('null_dates', 0)}")
-                print(f"[SpendingAnalyzer] 🔍 Date range: {dr.get('earliest')} to {dr.get('latest')}")
-                print(f"[SpendingAnalyzer] 🔍 Filtering: {start_of_month.isoformat()} to {now.isoformat()}")
-            
-       
-            result = self.kg.query(query, {
+            result = run_read(self.kg, _CYPHER_MONTHLY_SPENDING, {
                 "user_id": user_id,
                 "category": category,
                 "start_date": start_of_month.isoformat(),
@@ -70,10 +181,51 @@ class SpendingAnalyzer:
             
         except Exception as e:
             print(f"[SpendingAnalyzer] ❌ Query failed: {e}")
-            import traceback
-            traceback.print_exc()
+            # Full traceback only when debug logging is on
+            logger.debug("Traceback:", exc_info=True)
             return []
     
+    def get_spending_and_budget(self, user_id: str, category: str = None, now: datetime = None) -> tuple:
+        """
+        Get current month spending and budget status in a single query
+        
+        Args:
+            user_id: User identifier
+            category: Optional category filter for the spending part
+            now: Reference time (defaults to now)
+            
+        Returns:
+            (spending, budget_status, total_spent) where the lists are shaped like
+            get_monthly_spending() and check_budget_status() and total_spent is
+            summed in Neo4j
+            
+        Raises:
+            Exception: Query failures are re-raised so callers (and the
+            spending cache) don't mistake them for an empty month
+        """
+        if now is None:
+            now = datetime.now()
+        start_of_month = datetime(now.year, now.month, 1)
+        
+        try:
+            result = run_read(self.kg, _CYPHER_SPENDING_AND_BUDGET, {
+                "user_id": user_id,
+                "category": category,
+                "start_date": start_of_month.isoformat(),
+                "end_date": now.isoformat()
+            })
+            if not result:
+                return [], [], 0
+            
+            row = result[0]
+            spending, budget_status = row["spending"], row["budget_status"]
+            print(f"[SpendingAnalyzer] ✅ Found {len(spending)} spending categories, {len(budget_status)} budgets for user {user_id}")
+            return spending, budget_status, row["grand_total"]
+            
+        except Exception as e:
+            print(f"[SpendingAnalyzer] ❌ Spending/budget query failed: {e}")
+            raise
+    
     def check_budget_status(self, user_id: str) -> list:
         """
         Check budget usage across all categories
@@ -82,22 +234,8 @@ class SpendingAnalyzer:
             List of dicts with budget status by category
         """
 
-        query = """
-        MATCH (u:User {id: $user_id})-[:HAS_BUDGET]->(b:Budget)
-        OPTIONAL MATCH (u)-[:MADE_TRANSACTION]->(t:Transaction)
-        WHERE t.category = b.category 
-          AND t.type = 'expense'
-        WITH b, sum(COALESCE(t.amount, 0)) as spent
-        RETURN 
-            b.category as category,
-            b.monthly_limit as budget,
-            spent as spent,
-            (spent / b.monthly_limit * 100) as usage_percent
-        ORDER BY usage_percent DESC
-        """
-        
         try:
-            result = self.kg.query(query, {"user_id": user_id})
+            result = run_read(self.kg, _CYPHER_BUDGET_STATUS, {"user_id": user_id})
             
             print(f"[SpendingAnalyzer] ✅ Budget status check complete for user {user_id}")
             if result:
@@ -107,8 +245,8 @@ class SpendingAnalyzer:
             
         except Exception as e:
             print(f"[SpendingAnalyzer] ❌ Budget check failed: {e}")
-            import traceback
-            traceback.print_exc()
+            # Full traceback only when debug logging is on
+            logger.debug("Traceback:", exc_info=True)
             return []
 
     def get_daily_spending(self, user_id: str, date: datetime = None) -> list:
@@ -121,6 +259,9 @@ class SpendingAnalyzer:
             
         Returns:
             List of transactions for that day
+            
+        Raises:
+            Exception: Query failures are re-raised (see get_spending_and_budget)
         """
         if date is None:
             date = datetime.now()
@@ -128,23 +269,8 @@ class SpendingAnalyzer:
         start_of_day = datetime(date.year, date.month, date.day, 0, 0, 0)
         end_of_day = datetime(date.year, date.month, date.day, 23, 59, 59)
         
-        query = """
-        MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
-        WHERE t.type = 'expense'
-          AND t.date IS NOT NULL
-          AND t.date >= datetime($start_date)
-          AND t.date <= datetime($end_date)
-        RETURN 
-            t.date as date,
-            t.amount as amount,
-            COALESCE(t.category, 'other') as category,
-            t.description as description,
-            t.payment_mode as payment_mode
-        ORDER BY t.date DESC
-        """
-        
         try:
-            result = self.kg.query(query, {
+            result = run_read(self.kg, _CYPHER_DAILY_SPENDING, {
                 "user_id": user_id,
                 "start_date": start_of_day.isoformat(),
                 "end_date": end_of_day.isoformat()
@@ -155,7 +281,7 @@ class SpendingAnalyzer:
             
         except Exception as e:
             print(f"[SpendingAnalyzer] ❌ Daily query failed: {e}")
-            return []
+            raise
 
     def get_daily_summary(self, user_id: str, date: datetime = None) -> dict:
         """
@@ -163,6 +289,9 @@ class SpendingAnalyzer:
         
         Returns:
             Dict with total and breakdown by category
+            
+        Raises:
+            Exception: Query failures are re-raised (see get_spending_and_budget)
         """
         if date is None:
             date = datetime.now()
@@ -170,22 +299,8 @@ class SpendingAnalyzer:
         start_of_day = datetime(date.year, date.month, date.day, 0, 0, 0)
         end_of_day = datetime(date.year, date.month, date.day, 23, 59, 59)
         
-        query = """
-        MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
-        WHERE t.type = 'expense'
-          AND t.date IS NOT NULL
-          AND t.date >= datetime($start_date)
-          AND t.date <= datetime($end_date)
-        WITH COALESCE(t.category, 'other') as category, t.amount as amount
-        RETURN 
-            category,
-            sum(amount) as total_spent,
-            count(amount) as transaction_count
-        ORDER BY total_spent DESC
-        """
-        
         try:
-            result = self.kg.query(query, {
+            result = run_read(self.kg, _CYPHER_DAILY_SUMMARY, {
                 "user_id": user_id,
                 "start_date": start_of_day.isoformat(),
                 "end_date": end_of_day.isoformat()
@@ -203,7 +318,7 @@ class SpendingAnalyzer:
             
         except Exception as e:
             print(f"[SpendingAnalyzer] ❌ Daily summary failed: {e}")
-            return {"date": date.date().isoformat(), "total": 0, "by_category": [], "transaction_count": 0}
+            raise
 
     def get_date_range_spending(self, user_id: str, start_date: datetime, end_date: datetime) -> list:
         """
@@ -217,22 +332,8 @@ class SpendingAnalyzer:
         Returns:
             List of transactions in date range
         """
-        query = """
-        MATCH (u:User {id: $user_id})-[:MADE_TRANSACTION]->(t:Transaction)
-        WHERE t.type = 'expense'
-          AND t.date IS NOT NULL
-          AND t.date >= datetime($start_date)
-          AND t.date <= datetime($end_date)
-        RETURN 
-            t.date as date,
-            t.amount as amount,
-            COALESCE(t.category, 'other') as category,
-            t.description as description
-        ORDER BY t.date DESC
-        """
-        
         try:
-            result = self.kg.query(query, {
+            result = run_read(self.kg, _CYPHER_DATE_RANGE_SPENDING, {
                 "user_id": user_id,
                 "start_date": start_date.isoformat(),
                 "end_date": end_date.isoformat()
@@ -244,4 +345,43 @@ class SpendingAnalyzer:
         except Exception as e:
             print(f"[SpendingAnalyzer] ❌ Date range query failed: {e}")
             return []
- 
\ No newline at end of file
+ 
+    def get_date_range_summary(self, user_id: str, start_date: datetime, end_date: datetime) -> list:
+        """
+        Get per-day spending totals between two dates, aggregated in Neo4j
+        
+        Args:
+            user_id: User identifier
+            start_date: Start date (inclusive)
+            end_date: End date (inclusive)
+            
+        Returns:
+            List of {"date": "YYYY-MM-DD", "total": float, "count": int}, newest first
+            
+        Raises:
+            Exception: Query failures are re-raised (see get_spending_and_budget)
+        """
+        try:
+            result = run_read(self.kg, _CYPHER_DATE_RANGE_SUMMARY, {
+                "user_id": user_id,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat()
+            })
+            
+            print(f"[SpendingAnalyzer] ✅ Found {len(result)} spending days from {start_date.date()} to {end_date.date()}")
+            return result
+            
+        except Exception as e:
+            print(f"[SpendingAnalyzer] ❌ Date range summary failed: {e}")
+            raise
+
+
+@functools.lru_cache(maxsize=4)
+def get_spending_analyzer(kg_conn: Neo4jGraph) -> SpendingAnalyzer:
+    """
+    Get a shared SpendingAnalyzer for a Neo4j connection.
+    
+    Usage:
+        analyzer = get_spending_analyzer(get_finance_db().kg)
+    """
+    return SpendingAnalyzer(kg_conn)
@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Optional
+import asyncio
+import functools
+from langchain_neo4j import Neo4jGraph
+from db_.neo4j_finance import run_read
+
+
+# Same shape as _CYPHER_SPENDING_AND_BUDGET, one row per queued request;
+# each CALL aggregates without grouping keys, so users with no data still
+# get a row back
+_CYPHER_BATCH_SPENDING_AND_BUDGET = """
+UNWIND $requests AS r
+CALL {
+    WITH r
+    MATCH (u:User {id: r.user_id})-[:MADE_TRANSACTION]->(t:Transaction)
+    WHERE t.type = 'expense'
+      AND t.date IS NOT NULL
+      AND t.date >= datetime(r.start_date)
+      AND t.date <= datetime(r.end_date)
+      AND (r.category IS NULL OR t.category = r.category)
+    WITH COALESCE(t.category, 'other') as category, t.amount as amount
+    WITH category, sum(amount) as total_spent, count(amount) as transaction_count
+    ORDER BY total_spent DESC
+    RETURN collect({
+        category: category,
+        total_spent: total_spent,
+        transaction_count: transaction_count
+    }) as spending, sum(total_spent) as grand_total
+}
+CALL {
+    WITH r
+    MATCH (u:User {id: r.user_id})-[:HAS_BUDGET]->(b:Budget)
+    OPTIONAL MATCH (u)-[:MADE_TRANSACTION]->(t:Transaction)
+    WHERE t.category = b.category
+      AND t.type = 'expense'
+    WITH b, sum(COALESCE(t.amount, 0)) as spent
+    WITH b, spent, (spent / b.monthly_limit * 100) as usage_percent
+    ORDER BY usage_percent DESC
+    RETURN collect({
+        category: b.category,
+        budget: b.monthly_limit,
+        spent: spent,
+        usage_percent: usage_percent
+    }) as budget_status
+}
+RETURN r.idx as idx, spending, grand_total, budget_status
+"""
+
+
+class SpendingBatcher:
+    """
+    Coalesces concurrent spending/budget reads into one UNWIND query.
+
+    Requests queued within `window` seconds (or until `max_batch` are
+    waiting) share a single session and transaction instead of each
+    borrowing its own from the pool.
+    """
+
+    def __init__(self, kg_conn: Neo4jGraph, window: float = 0.005, max_batch: int = 32):
+        self.kg = kg_conn
+        self.window = window
+        self.max_batch = max_batch
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+
+    async def get_spending(self, user_id: str, category: str = None, now: datetime = None) -> tuple:
+        """
+        Get current month spending and budget status, batched with other callers
+
+        Args:
+            user_id: User identifier
+            category: Optional category filter for the spending part
+            now: Reference time (defaults to now)
+
+        Returns:
+            (spending, budget_status, total_spent), same as
+            SpendingAnalyzer.get_spending_and_budget()
+        """
+        if now is None:
+            now = datetime.now()
+        start_of_month = datetime(now.year, now.month, 1)
+
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        await self._queue.put(({
+            "user_id": user_id,
+            "category": category,
+            "start_date": start_of_month.isoformat(),
+            "end_date": now.isoformat()
+        }, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Queues and tasks are bound to one loop; callers that use
+        # asyncio.run() get a fresh loop each time
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush concurrently so one slow query doesn't hold up every
+            # other user's batch
+            flush = self._loop.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(functools.partial(self._flush_done, batch))
+
+    def _flush_done(self, batch: list, flush: asyncio.Task) -> None:
+        self._flushes.discard(flush)
+        if flush.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+        error = flush.exception()
+        if error is None:
+            return
+        # _flush only handles query errors; never leave a caller waiting
+        print(f"[SpendingBatcher] ❌ Flush of {len(batch)} request(s) crashed: {error}")
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _flush(self, batch: list) -> None:
+        requests = [dict(params, idx=i) for i, (params, _) in enumerate(batch)]
+        try:
+            rows = await asyncio.to_thread(
+                run_read, self.kg, _CYPHER_BATCH_SPENDING_AND_BUDGET, {"requests": requests}
+            )
+        except Exception as e:
+            print(f"[SpendingBatcher] ❌ Batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_idx = {row["idx"]: row for row in rows}
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            row = by_idx.get(i)
+            if row is None:
+                future.set_result(([], [], 0))
+            else:
+                future.set_result((row["spending"], row["budget_status"], row["grand_total"]))
+        print(f"[SpendingBatcher] ✅ Served {len(batch)} request(s) in one query")
+
+
+@functools.lru_cache(maxsize=4)
+def get_spending_batcher(kg_conn: Neo4jGraph) -> SpendingBatcher:
+    """
+    Get a shared SpendingBatcher for a Neo4j connection.
+
+    Usage:
+        spending, budget_status, total = await get_spending_batcher(kg).get_spending(user_id)
+    """
+    return SpendingBatcher(kg_conn)
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+
+class SpendingCache:
+    """
+    Small thread-safe LRU cache with a TTL for spending/budget reads.
+
+    Keys are tuples whose first element is the user_id, so all entries for
+    a user can be dropped after that user writes a transaction or budget.
+
+    Loader exceptions propagate and nothing is stored. Each user also has a
+    generation counter bumped by invalidate_user(); a load that started
+    before the last invalidation is returned to its caller but not stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._generations: dict = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Tuple[Hashable, ...], loader: Callable, *args) -> Any:
+        """
+        Return the cached value for key, calling loader(*args) on a miss
+
+        Args:
+            key: Tuple starting with user_id
+            loader: Function that fetches the fresh value
+            *args: Arguments passed to loader
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        hit, value, generation = self._lookup(key)
+        if hit:
+            return value
+
+        # Load outside the lock so a slow query doesn't block other users
+        value = loader(*args)
+        self._store(key, value, generation)
+        return value
+
+    async def aget_or_load(self, key: Tuple[Hashable, ...], loader: Callable[..., Awaitable], *args) -> Any:
+        """Same as get_or_load, for a coroutine loader"""
+        hit, value, generation = self._lookup(key)
+        if hit:
+            return value
+
+        value = await loader(*args)
+        self._store(key, value, generation)
+        return value
+
+    def _lookup(self, key: Tuple[Hashable, ...]) -> Tuple[bool, Any, int]:
+        # Returns (hit, value, generation); the generation is read under the
+        # same lock so an invalidation after this point voids the load
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                return True, entry[1], 0
+            return False, None, self._generations.get(key[0], 0)
+
+    def _store(self, key: Tuple[Hashable, ...], value: Any, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                # The user wrote something while this value was loading
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached entry belonging to user_id"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [k for k in self._data if k[0] == user_id]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_spending_cache = SpendingCache()
+
+
+def get_spending_cache() -> SpendingCache:
+    """Get the process-wide spending cache"""
+    return _spending_cache
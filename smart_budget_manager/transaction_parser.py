@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Literal
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+from llm.groq_client import groq_chat
 from datetime import datetime
+import functools
 
 # Extract transaction details
 class TransactionExtract(BaseModel):
@@ -15,7 +16,7 @@ class TransactionExtract(BaseModel):
     date: Optional[str] = Field(None, description="Transaction date if mentioned, format: YYYY-MM-DD")
 
 
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = groq_chat(model="llama-3.1-8b-instant", temperature=0)
 
 
 transaction_prompt = ChatPromptTemplate.from_messages([
@@ -51,6 +52,20 @@ Examples:
     ("human", "{user_message}")
 ])
 
+transaction_chain = transaction_prompt | llm.with_structured_output(TransactionExtract)
+
+
+@functools.lru_cache(maxsize=4096)
+def _extract_transaction_json(normalized_message: str, today: str) -> str:
+    """
+    Run the LLM extraction once per (message, day) and cache the raw result.
+    
+    `today` is part of the key so relative dates ("yesterday") are
+    re-resolved after midnight. Failures raise and are not cached.
+    """
+    return transaction_chain.invoke({"user_message": normalized_message}).model_dump_json()
+
+
 def parse_transaction(user_message: str) -> Optional[TransactionExtract]:
     """
     Parse transaction from natural language.
@@ -61,13 +76,18 @@ def parse_transaction(user_message: str) -> Optional[TransactionExtract]:
     Returns:
         TransactionExtract object or None if parsing fails
     """
-    chain = transaction_prompt | llm.with_structured_output(TransactionExtract)
+    today = datetime.now().strftime("%Y-%m-%d")
+    # Retries/resends of the same text ("spent 50 on tea") hit the cache
+    normalized = " ".join(user_message.lower().split())
     
     try:
-        transaction = chain.invoke({"user_message": user_message})
+        # Fresh model per call, so callers can't mutate the cached result
+        transaction = TransactionExtract.model_validate_json(
+            _extract_transaction_json(normalized, today)
+        )
         
         if not transaction.date:
-            transaction.date = datetime.now().strftime("%Y-%m-%d")
+            transaction.date = today
             print(f"[TransactionParser] ⚠️ No date in query, using today: {transaction.date}")
         
         # Log parsed details
@@ -0,0 +1,41 @@
+import os
+import unittest
+
+# finance_agent builds its Groq clients at import time
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from agent.finance_agent import _parse_budget_fast
+
+
+class ParseBudgetFastTest(unittest.TestCase):
+    def test_plain_phrasings(self):
+        cases = {
+            "Set food budget to 5000": ("food", 5000.0),
+            "My transport budget is 2,000 monthly": ("transport", 2000.0),
+            "budget is 500 on food": ("food", 500.0),
+            "5000 for shopping": ("shopping", 5000.0),
+        }
+        for message, (category, limit) in cases.items():
+            with self.subTest(message=message):
+                intent = _parse_budget_fast(message)
+                self.assertIsNotNone(intent)
+                self.assertEqual((intent.category, intent.limit), (category, limit))
+
+    def test_ambiguous_phrasings_fall_back_to_llm(self):
+        for message in (
+            "set food budget to 5k",
+            "set food budget to 2 lakh",
+            "food budget 10 thousand",
+            "change food budget from 3000 to 5000",
+            "food budget for march 2025 is 5000",
+            "food budget from the 5th",
+            "increase food budget by 500",
+            "cut food budget 10%",
+            "set food budget",
+        ):
+            with self.subTest(message=message):
+                self.assertIsNone(_parse_budget_fast(message))
+
+
+if __name__ == "__main__":
+    unittest.main()
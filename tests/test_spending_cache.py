@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import unittest
+
+from smart_budget_manager.spending_cache import SpendingCache
+
+
+class SpendingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SpendingCache(ttl=60.0)
+        self.key = ("user-1", "spending_and_budget", None, "2025-03")
+
+    def test_hit_skips_loader(self):
+        calls = []
+        loader = lambda: calls.append(1) or len(calls)
+        self.assertEqual(self.cache.get_or_load(self.key, loader), 1)
+        self.assertEqual(self.cache.get_or_load(self.key, loader), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_load_is_not_cached(self):
+        def failing():
+            raise ConnectionError("neo4j unavailable")
+
+        with self.assertRaises(ConnectionError):
+            self.cache.get_or_load(self.key, failing)
+        self.assertEqual(self.cache.get_or_load(self.key, lambda: "fresh"), "fresh")
+
+    def test_transaction_added_during_load_is_not_hidden(self):
+        # A read starts, the user logs a transaction (which invalidates the
+        # cache) while the query is still running, then the stale read returns
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def slow_stale_load():
+            started.set()
+            release.wait(5)
+            return "before transaction"
+
+        reader = threading.Thread(
+            target=lambda: results.append(self.cache.get_or_load(self.key, slow_stale_load))
+        )
+        reader.start()
+        self.assertTrue(started.wait(5))
+        self.cache.invalidate_user("user-1")
+        release.set()
+        reader.join(5)
+
+        # The in-flight caller still gets its own result...
+        self.assertEqual(results, ["before transaction"])
+        # ...but the next read reloads instead of serving it
+        self.assertEqual(self.cache.get_or_load(self.key, lambda: "after transaction"), "after transaction")
+
+    def test_async_load_started_before_invalidation_is_not_stored(self):
+        async def scenario():
+            async def load():
+                self.cache.invalidate_user("user-1")
+                return "before transaction"
+
+            async def fresh():
+                return "after transaction"
+
+            self.assertEqual(await self.cache.aget_or_load(self.key, load), "before transaction")
+            self.assertEqual(await self.cache.aget_or_load(self.key, fresh), "after transaction")
+
+        asyncio.run(scenario())
+
+    def test_invalidation_only_affects_that_user(self):
+        other = ("user-2",) + self.key[1:]
+        self.cache.get_or_load(self.key, lambda: "one")
+        self.cache.get_or_load(other, lambda: "two")
+        self.cache.invalidate_user("user-1")
+        self.assertEqual(self.cache.get_or_load(self.key, lambda: "one again"), "one again")
+        self.assertEqual(self.cache.get_or_load(other, lambda: "unused"), "two")
+
+
+if __name__ == "__main__":
+    unittest.main()